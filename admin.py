@@ -1,24 +1,144 @@
-from fastapi import APIRouter, HTTPException
-from supabase import create_client, Client
+import base64
+import json
+import logging
 import os
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from database import get_repository
+from repository import SupabaseRepository
+from schemas import (
+    AdminDestinationPage, AdminDestinationResponse, AdminUserPage, AdminUserResponse, UserBulkDeleteSchema
+)
+from projections import projection
+from cache import CatalogCache, get_catalog_cache
+from http_cache import conditional_response
+from ranking import RecommendationEngine, get_recommender
+from models import password_hasher
+from ai_chat import chat_cache, destination_matcher, llm_gateway
+from jobs import JobQueue, get_job_queue
+from trip_status import TripStatusReconciler, get_trip_reconciler
+from rate_limit import rate_limiter
 
 router = APIRouter()
+logger = logging.getLogger("tripolingo.admin")
 
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
+# ===============================
+# 📄 PAGINATED LISTINGS
+# ===============================
+ADMIN_PAGE_SIZE = 50
+ADMIN_MAX_PAGE_SIZE = 200
+
+# Total-count modes PostgREST understands; "estimated" avoids a full scan
+COUNT_MODES = ("estimated", "planned", "exact")
+
+USER_SORTS = ("id", "username", "email", "created_at")
+DESTINATION_SORTS = ("id", "name", "country")
+
+
+def _parse_sort(sort: str, allowed: tuple):
+    """
+    "name" sorts ascending, "-name" descending.
+    """
+    column = sort.lstrip("-")
+    if column not in allowed:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(allowed)}")
+    return column, sort.startswith("-")
+
+
+def encode_admin_cursor(row: dict, sort: str) -> str:
+    raw = json.dumps({"s": sort, "v": row[sort.lstrip("-")], "i": row["id"]}, default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_admin_cursor(cursor: str, sort: str) -> tuple:
+    """
+    Cursors carry the sort they were issued for, so a page never mixes orders.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        after = (data["v"], data["i"])
+        issued_for = data["s"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if issued_for != sort:
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different sort")
+    return after
+
+
+async def _list_page(search, row_projection, allowed_sorts, q, sort, limit, cursor, count):
+    """
+    Run an admin listing. Without limit/cursor/count it returns the plain
+    list admin.js has always received; otherwise a page
+    {"items", "next_cursor", "total"}. The total is only computed for the
+    first page of a count request (later pages are narrowed by the cursor,
+    so PostgREST's count would not be the listing total).
+    """
+    column, descending = _parse_sort(sort, allowed_sorts)
+    if count is not None and count not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"count must be one of: {', '.join(COUNT_MODES)}")
+
+    paged = limit is not None or cursor is not None or count is not None
+    after = decode_admin_cursor(cursor, sort) if cursor else None
+    page_size = limit or ADMIN_PAGE_SIZE
 
-@router.get("/admin/destinations")
-async def get_all_destinations():
     try:
-        result = supabase.table("destinations").select("*").execute()
-        return result.data
+        rows, total = await search(
+            row_projection,
+            q=q,
+            sort=column,
+            descending=descending,
+            after=after,
+            # One extra row tells us whether another page exists
+            limit=page_size + 1 if paged else None,
+            count=count if after is None else None,
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if not paged:
+        return rows
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return {
+        "items": rows,
+        "next_cursor": encode_admin_cursor(rows[-1], sort) if has_more else None,
+        "total": total
+    }
+
+
+@router.get(
+    "/admin/destinations",
+    response_model=Union[List[AdminDestinationResponse], AdminDestinationPage],
+)
+async def get_all_destinations(
+    request: Request,
+    q: Optional[str] = None,
+    sort: str = "id",
+    limit: Optional[int] = Query(None, ge=1, le=ADMIN_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
+    repository: SupabaseRepository = Depends(get_repository),
+):
+    """
+    List destinations. `q` matches the start of the name or country,
+    `sort` is name/country/id (prefix "-" for descending), `limit`/`cursor`
+    page by keyset and `count=estimated` adds an approximate total.
+    """
+    destinations = await _list_page(
+        repository.search_destinations, projection("admin.destinations"), DESTINATION_SORTS,
+        q, sort, limit, cursor, count
+    )
+    # Admins always revalidate, but an unchanged list comes back as 304
+    return conditional_response(request, destinations, cache_control="private, no-cache")
+
 @router.post("/admin/destinations")
-async def create_destination(data: dict):
+async def create_destination(
+    data: dict,
+    repository: SupabaseRepository = Depends(get_repository),
+    catalog: CatalogCache = Depends(get_catalog_cache),
+):
     try:
         name = data.get("name")
         country = data.get("country")
@@ -38,27 +158,34 @@ async def create_destination(data: dict):
             "active": active
         }
 
-        result = supabase.table("destinations").insert(destination_data).execute()
-        return {"success": True, "data": result.data}
+        result = await repository.insert_destination(destination_data)
+        catalog.invalidate()
+        return {"success": True, "data": result}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.patch("/admin/destinations/{destination_id}")
-async def update_destination(destination_id: str, data: dict = None):
+async def update_destination(
+    destination_id: str,
+    data: dict = None,
+    repository: SupabaseRepository = Depends(get_repository),
+    catalog: CatalogCache = Depends(get_catalog_cache),
+):
     try:
         # Get current destination
-        current = supabase.table("destinations").select("*").eq("id", destination_id).execute()
+        current = await repository.get_destination(destination_id, projection("admin.destination_toggle"))
         
-        if not current.data or len(current.data) == 0:
+        if not current:
             raise HTTPException(status_code=404, detail="Destination not found")
         
         # If no data provided, toggle active status (backward compatibility)
         if not data:
-            current_active = current.data[0].get("active", False)
+            current_active = current.get("active", False)
             new_active = not current_active
-            result = supabase.table("destinations").update({"active": new_active}).eq("id", destination_id).execute()
-            return {"success": True, "data": result.data}
+            result = await repository.update_destination(destination_id, {"active": new_active})
+            catalog.invalidate()
+            return {"success": True, "data": result}
         
         # Build update object from provided data
         update_data = {}
@@ -78,64 +205,148 @@ async def update_destination(destination_id: str, data: dict = None):
             update_data["active"] = data["active"]
         
         # Update in database
-        result = supabase.table("destinations").update(update_data).eq("id", destination_id).execute()
+        result = await repository.update_destination(destination_id, update_data)
+        catalog.invalidate()
         
-        return {"success": True, "data": result.data}
+        return {"success": True, "data": result}
     
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/admin/users")
-async def get_all_users():
+@router.get("/admin/users", response_model=Union[List[AdminUserResponse], AdminUserPage])
+async def get_all_users(
+    request: Request,
+    q: Optional[str] = None,
+    sort: str = "id",
+    limit: Optional[int] = Query(None, ge=1, le=ADMIN_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
+    repository: SupabaseRepository = Depends(get_repository),
+):
+    """
+    List users. `q` matches the start of the username or email, `sort` is
+    username/email/created_at/id (prefix "-" for descending), `limit`/`cursor`
+    page by keyset and `count=estimated` adds an approximate total.
+    """
+    users = await _list_page(
+        repository.search_users, projection("admin.users"), USER_SORTS,
+        q, sort, limit, cursor, count
+    )
+    # Rows are already limited to the admin.users projection, so they are
+    # encoded as-is rather than validated against the response model
+    return conditional_response(request, users, cache_control="private, no-cache")
+
+@router.delete("/admin/destinations/{destination_id}")
+async def delete_destination(
+    destination_id: str,
+    repository: SupabaseRepository = Depends(get_repository),
+    catalog: CatalogCache = Depends(get_catalog_cache),
+):
     try:
-        result = supabase.table("users").select("*").execute()
-        return result.data
+        result = await repository.delete_destination(destination_id)
+        catalog.invalidate()
+        return {"success": True, "data": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.delete("/admin/destinations/{destination_id}")
-async def delete_destination(destination_id: str):
+ADMIN_BULK_DELETE_MAX = int(os.getenv("ADMIN_BULK_DELETE_MAX", "500"))
+
+
+async def _delete_users(user_ids: list, repository: SupabaseRepository, recommender: RecommendationEngine) -> dict:
+    logger.info("Deleting %d user(s): %s", len(user_ids), ", ".join(user_ids))
+
     try:
-        result = supabase.table("destinations").delete().eq("id", destination_id).execute()
-        return {"success": True, "data": result.data}
+        result = await repository.delete_users_cascade(user_ids)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.exception("Cascade delete failed for %s", ", ".join(user_ids))
+        raise HTTPException(status_code=500, detail=f"Failed to delete users: {e}")
+
+    for user_id in result["users"]:
+        recommender.invalidate(user_id)
+
+    logger.info(
+        "Deleted %d user(s), %d trip(s), %d preference row(s)",
+        len(result["users"]), result["trips"], result["preferences"]
+    )
+    return result
+
 
 @router.delete("/admin/users/{user_id}")
-async def delete_user(user_id: str):
+async def delete_user(
+    user_id: str,
+    repository: SupabaseRepository = Depends(get_repository),
+    recommender: RecommendationEngine = Depends(get_recommender),
+):
+    """
+    Delete a user with their trips and preferences (see delete_users_cascade).
+    """
+    result = await _delete_users([str(user_id)], repository, recommender)
+
+    if not result["users"]:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return {"success": True, "deleted": result}
+
+@router.post("/admin/users/delete")
+async def delete_users(
+    data: UserBulkDeleteSchema,
+    repository: SupabaseRepository = Depends(get_repository),
+    recommender: RecommendationEngine = Depends(get_recommender),
+):
+    """
+    Delete many users (and their trips and preferences) in one cascade,
+    for cleanup jobs. Ids that matched no user are listed in "not_found".
+    """
+    user_ids = list(dict.fromkeys(str(user_id) for user_id in data.user_ids))
+
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="No user ids")
+    if len(user_ids) > ADMIN_BULK_DELETE_MAX:
+        raise HTTPException(status_code=413, detail=f"Too many users (max {ADMIN_BULK_DELETE_MAX})")
+
+    result = await _delete_users(user_ids, repository, recommender)
+    deleted = set(result["users"])
+
+    return {
+        "success": True,
+        "deleted": result,
+        "not_found": [user_id for user_id in user_ids if user_id not in deleted]
+    }
+
+@router.post("/admin/trips/reconcile")
+async def reconcile_trip_statuses(
+    full: bool = False,
+    reconciler: TripStatusReconciler = Depends(get_trip_reconciler),
+):
+    """
+    Run the trip status reconciliation now instead of waiting for the schedule.
+    `full=true` rescans every dated trip instead of only the crossed boundaries.
+    """
     try:
-        # Convert user_id to string for matching
-        user_id_str = str(user_id)
-        
-        print(f"Attempting to delete user: {user_id_str}")
-        
-        # Delete user's trips first (trips.user_id is text)
-        try:
-            trips_result = supabase.table("trips").delete().eq("user_id", user_id_str).execute()
-            print(f"Deleted {len(trips_result.data) if trips_result.data else 0} trips")
-        except Exception as trip_err:
-            print(f"Error deleting trips: {trip_err}")
-            # Continue even if trips deletion fails
-        
-        # Delete user preferences (user_id is text)
-        try:
-            prefs_result = supabase.table("user_preferences").delete().eq("user_id", user_id_str).execute()
-            print(f"Deleted {len(prefs_result.data) if prefs_result.data else 0} preferences")
-        except Exception as pref_err:
-            print(f"Error deleting preferences: {pref_err}")
-            # Continue even if preferences deletion fails
-        
-        # Delete the user (users.id is uuid)
-        try:
-            user_result = supabase.table("users").delete().eq("id", user_id_str).execute()
-            print(f"User deleted successfully")
-            return {"success": True}
-        except Exception as user_err:
-            print(f"Error deleting user: {user_err}")
-            return {"success": False, "error": f"Failed to delete user: {str(user_err)}"}
-            
+        return {"success": True, **await reconciler.run(full=full)}
     except Exception as e:
-        print(f"Unexpected error in delete_user: {e}")
-        return {"success": False, "error": str(e)}
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/admin/stats")
+async def get_stats(
+    catalog: CatalogCache = Depends(get_catalog_cache),
+    recommender: RecommendationEngine = Depends(get_recommender),
+    jobs: JobQueue = Depends(get_job_queue),
+    reconciler: TripStatusReconciler = Depends(get_trip_reconciler),
+):
+    """
+    Runtime counters for the in-process caches and worker pools.
+    """
+    return {
+        "catalog_cache": catalog.stats(),
+        "recommendations": recommender.stats(),
+        "password_hashing": password_hasher.stats(),
+        "chat_cache": chat_cache.stats(),
+        "llm_gateway": llm_gateway.stats(),
+        "destination_matcher": destination_matcher.stats(),
+        "jobs": jobs.stats(),
+        "trip_status": reconciler.stats(),
+        "rate_limits": rate_limiter.stats()
+    }
@@ -1,94 +1,54 @@
-from fastapi import APIRouter, HTTPException
-from groq import Groq
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from groq import AsyncGroq
 import os
-from database import supabase
+from database import get_repository
+from repository import SupabaseRepository
+from tokens import authorize_user, get_token_claims
+from cache import CatalogCache, ResponseCache, get_catalog_cache
+from matcher import DestinationMatcher, compile_keywords
+from jobs import JobQueue, QueueFull, get_job_queue
+from trip_status import derive_status
+from projections import projection
+from llm_gateway import LLM_TIMEOUT, LLMGateway
+from rate_limit import rate_limit
 from datetime import datetime, timedelta
+import hashlib
 import json
+import logging
+import re
+import uuid
 
 router = APIRouter()
-
-client = Groq(
-    api_key=os.getenv("GROQ_API_KEY")
+logger = logging.getLogger("tripolingo.ai_chat")
+
+# GROQ_BASE_URL lets tests and benchmarks point the client at a local fake LLM server
+client = AsyncGroq(
+    api_key=os.getenv("GROQ_API_KEY"),
+    base_url=os.getenv("GROQ_BASE_URL") or None,
+    timeout=LLM_TIMEOUT,
+    max_retries=0
 )
 
-@router.post("/ai/chat/{user_id}")
-async def chat_ai(user_id: str, data: dict):
+# 🚦 Concurrency cap, timeouts, circuit breaker and coalescing for Groq calls
+llm_gateway = LLMGateway()
 
-    try:
-        message = data.get("message")
+GROQ_MODEL = "llama-3.1-8b-instant"
 
-        if not message:
-            return {
-                "reply": "Please enter a message.",
-                "suggested_destinations": [],
-                "trip_created": None
-            }
-
-        # 🛡 PROTECT AGAINST NULL USER
-        if not user_id or user_id == "null" or user_id == "undefined":
-            user_id = "guest_user"
-
-        message_lower = message.lower()
-
-        # 🧠 Detect trip intent
-        trip_intent_keywords = [
-            "plan trip",
-            "book trip",
-            "create trip",
-            "add trip",
-            "i want to go",
-            "plan a trip",
-            "trip to"
-        ]
-
-        is_trip_request = any(k in message_lower for k in trip_intent_keywords)
-
-        # 🧠 Detect destination
-        destinations = [
-            "Japan", "Kyoto", "Paris", "Bali",
-            "Reykjavik", "Tokyo", "Italy",
-            "Switzerland", "Dubai", "Thailand"
-        ]
-
-        chosen_destination = None
-        for d in destinations:
-            if d.lower() in message_lower:
-                chosen_destination = d
-
-        # 🛡 SAFE DEFAULT USER CONTEXT
-        travel_style = "Not set"
-        interests = "Not set"
-        budget = "Not set"
-
-        # 🛡 SAFE SUPABASE BLOCK - Fetch from users table only
-        try:
-            user_info = supabase.table("users") \
-                .select("*") \
-                .eq("id", user_id) \
-                .execute()
-
-            if user_info.data:
-                u = user_info.data[0]
-                # Get preferences from users table columns (set via profile page)
-                budget = u.get('preferred_budget', 'Not set')
-                activities = u.get('preferred_activities', [])
-                regions = u.get('preferred_regions', [])
-                
-                # Format for AI context
-                travel_style = ", ".join(activities) if activities else "Not set"
-                interests = ", ".join(regions) if regions else "Not set"
-
-        except Exception as db_error:
-            print("⚠️ Supabase error:", db_error)
-
-        context_prompt = f"""
-User Travel Style: {travel_style}
-User Interests: {interests}
-Budget: {budget}
-"""
+# 💾 Cache for repeated prompts (same normalized message + same preference context)
+chat_cache = ResponseCache(
+    ttl=float(os.getenv("CHAT_CACHE_TTL", "3600")),
+    max_bytes=int(os.getenv("CHAT_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    max_entry_bytes=int(os.getenv("CHAT_CACHE_MAX_ENTRY_BYTES", "16384"))
+)
 
-        # 🎯 Cinematic Travel Assistant Prompt
-        system_message = """
+UNAVAILABLE_REPLY = "AI service temporarily unavailable. Please try again."
+FALLBACK_REPLY = "Which destination would you like to explore?"
+ERROR_REPLY = "Something went wrong. Please try again."
+
+# 🎯 Cinematic Travel Assistant Prompt
+SYSTEM_MESSAGE = """
 You are Tripolingo AI — a cinematic smart travel assistant inside a travel planning app.
 
 ROLE:
@@ -128,60 +88,314 @@ GOAL:
 Act like a fast, cinematic travel assistant that helps users explore and plan trips efficiently inside the Tripolingo app.
 """
 
-        # 🛡 SAFE GROQ CALL
+# 🧠 Trip intent keywords
+TRIP_INTENT_KEYWORDS = [
+    "plan trip",
+    "book trip",
+    "create trip",
+    "add trip",
+    "i want to go",
+    "plan a trip",
+    "trip to"
+]
+
+# 🧠 Known destinations
+KNOWN_DESTINATIONS = [
+    "Japan", "Kyoto", "Paris", "Bali",
+    "Reykjavik", "Tokyo", "Italy",
+    "Switzerland", "Dubai", "Thailand"
+]
+
+
+# One compiled pass over the message for intents and destinations
+trip_intent_pattern = compile_keywords(TRIP_INTENT_KEYWORDS)
+destination_matcher = DestinationMatcher(KNOWN_DESTINATIONS)
+
+
+def _chat_response(reply: str, trip_created=None) -> dict:
+    return {
+        "reply": reply,
+        "suggested_destinations": [],
+        "trip_created": trip_created
+    }
+
+
+def _normalize_user_id(user_id: str) -> str:
+    # 🛡 PROTECT AGAINST NULL USER
+    if not user_id or user_id == "null" or user_id == "undefined":
+        return "guest_user"
+    return user_id
+
+
+async def _sync_matcher(catalog: CatalogCache):
+    """
+    Keep the destination matcher in step with the live catalog.
+    """
+    try:
+        destinations = await catalog.get()
+        destination_matcher.sync(destinations, catalog.etag)
+    except Exception as catalog_error:
+        logger.warning("Catalog unavailable for chat", extra={"event": "chat_catalog_error", "error": str(catalog_error)})
+
+
+def _detect_trip(message: str):
+    """
+    Return (is_trip_request, chosen_destination) for a chat message.
+    chosen_destination is the best matcher entry ({"name", "country", ...}) or None.
+    """
+    is_trip_request = trip_intent_pattern.search(message) is not None
+    chosen_destination = destination_matcher.best_match(message)
+
+    return is_trip_request, chosen_destination
+
+
+async def _build_context(user_id: str, claims: Optional[dict], repository: SupabaseRepository) -> str:
+    """
+    Build the preference context prompt for the LLM.
+    """
+    # 🛡 SAFE DEFAULT USER CONTEXT
+    travel_style = "Not set"
+    interests = "Not set"
+    budget = "Not set"
+
+    # 🛡 SAFE SUPABASE BLOCK - Fetch from users table only
+    try:
+        # A bearer token already carries the preferences - skip the lookup
+        if claims is not None:
+            u = claims.get("prefs")
+        else:
+            u = await repository.get_user_by_id(user_id, projection("ai_chat.context"))
+
+        if u:
+            # Get preferences from users table columns (set via profile page)
+            budget = u.get('preferred_budget', 'Not set')
+            activities = u.get('preferred_activities', [])
+            regions = u.get('preferred_regions', [])
+
+            # Format for AI context
+            travel_style = ", ".join(activities) if activities else "Not set"
+            interests = ", ".join(regions) if regions else "Not set"
+
+    except Exception as db_error:
+        logger.warning("User context unavailable for chat", extra={"event": "chat_context_error", "error": str(db_error)})
+
+    return f"""
+User Travel Style: {travel_style}
+User Interests: {interests}
+Budget: {budget}
+"""
+
+
+def _cache_key(message: str, context_prompt: str) -> str:
+    """
+    Key replies by the normalized message plus the user's preference context,
+    so "Suggest places in Japan" and "suggest places in japan?" share an entry.
+    """
+    normalized = re.sub(r"\s+", " ", message.lower()).strip().rstrip("?!. ")
+    raw = f"{normalized}\x00{context_prompt}".encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def _llm_messages(context_prompt: str, message: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "system", "content": context_prompt},
+        {"role": "user", "content": message}
+    ]
+
+
+def _queue_trip(jobs: JobQueue, user_id: str, destination: dict, repository: SupabaseRepository):
+    """
+    🎬 Auto Trip Creation (SAFE) - queue the insert and return a pending
+    trip reference right away, or None if the queue is full.
+    """
+    future_date = (datetime.utcnow() + timedelta(days=30)).date()
+
+    trip_data = {
+        "user_id": user_id,
+        "destination": destination["name"],
+        "country": destination["country"],
+        "trip_date": str(future_date),
+        "status": derive_status(future_date, future_date, datetime.utcnow().date())
+    }
+
+    # Jobs are retried, so the insert must be idempotent
+    idempotency_key = uuid.uuid4().hex
+
+    try:
+        job = jobs.submit("create_trip", lambda: repository.insert_trip_once(trip_data, idempotency_key))
+    except QueueFull as queue_error:
+        logger.warning("Trip creation not queued", extra={"event": "chat_trip_rejected", "error": str(queue_error)})
+        return None
+
+    return {
+        "job_id": job.id,
+        "job_status": job.status,
+        **trip_data
+    }
+
+
+@router.post("/ai/chat/{user_id}", dependencies=[Depends(rate_limit("ai_chat"))])
+async def chat_ai(
+    user_id: str,
+    data: dict,
+    repository: SupabaseRepository = Depends(get_repository),
+    catalog: CatalogCache = Depends(get_catalog_cache),
+    jobs: JobQueue = Depends(get_job_queue),
+    claims: Optional[dict] = Depends(get_token_claims),
+):
+    authorize_user(claims, user_id)
+
+    try:
+        message = data.get("message")
+
+        if not message:
+            return _chat_response("Please enter a message.")
+
+        user_id = _normalize_user_id(user_id)
+        await _sync_matcher(catalog)
+        is_trip_request, chosen_destination = _detect_trip(message)
+        context_prompt = await _build_context(user_id, claims, repository)
+
+        # 💾 Trip requests have side effects, so they always reach the LLM
+        prompt_key = _cache_key(message, context_prompt)
+        if is_trip_request:
+            chat_cache.record_bypass()
+        else:
+            cached_reply = chat_cache.get(prompt_key)
+            if cached_reply is not None:
+                return _chat_response(cached_reply)
+
+        # 🛡 SAFE GROQ CALL (identical in-flight prompts share one call)
         try:
-            completion = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "system", "content": context_prompt},
-                    {"role": "user", "content": message}
-                ],
-                temperature=0.7,
-                max_tokens=300
+            completion = await llm_gateway.complete(
+                prompt_key,
+                lambda: client.chat.completions.create(
+                    model=GROQ_MODEL,
+                    messages=_llm_messages(context_prompt, message),
+                    temperature=0.7,
+                    max_tokens=300
+                )
             )
 
             reply = completion.choices[0].message.content.strip()
 
         except Exception as groq_error:
-            print("🔥 Groq error:", groq_error)
-            return {
-                "reply": "AI service temporarily unavailable. Please try again.",
-                "suggested_destinations": [],
-                "trip_created": None
-            }
-
-        # 🎬 Auto Trip Creation (SAFE)
+            logger.warning("Groq call failed", extra={"event": "chat_llm_error", "error": str(groq_error)})
+            return _chat_response(UNAVAILABLE_REPLY)
+
+        if not is_trip_request and reply:
+            chat_cache.put(prompt_key, reply)
+
         created_trip = None
 
         if is_trip_request and chosen_destination:
-            try:
-                future_date = (datetime.utcnow() + timedelta(days=30)).date()
+            created_trip = _queue_trip(jobs, user_id, chosen_destination, repository)
+
+        return _chat_response(reply if reply else FALLBACK_REPLY, created_trip)
 
-                trip_data = {
-                    "user_id": user_id,
-                    "destination": chosen_destination,
-                    "country": "",
-                    "trip_date": str(future_date),
-                    "status": "planning"
-                }
+    except Exception as e:
+        logger.exception("Chat request failed", extra={"event": "chat_error"})
+        return _chat_response(ERROR_REPLY)
 
-                res = supabase.table("trips").insert(trip_data).execute()
-                created_trip = res.data
 
-            except Exception as trip_error:
-                print("⚠️ Trip creation error:", trip_error)
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, default=str) + "\n").encode("utf-8")
 
-        return {
-            "reply": reply if reply else "Which destination would you like to explore?",
-            "suggested_destinations": [],
-            "trip_created": created_trip
-        }
 
-    except Exception as e:
-        print("🔥 CRITICAL ERROR:", e)
-        return {
-            "reply": "Something went wrong. Please try again.",
-            "suggested_destinations": [],
-            "trip_created": None
-        }
\ No newline at end of file
+@router.post("/ai/chat/{user_id}/stream", dependencies=[Depends(rate_limit("ai_chat"))])
+async def chat_ai_stream(
+    user_id: str,
+    data: dict,
+    repository: SupabaseRepository = Depends(get_repository),
+    catalog: CatalogCache = Depends(get_catalog_cache),
+    jobs: JobQueue = Depends(get_job_queue),
+    claims: Optional[dict] = Depends(get_token_claims),
+):
+    """
+    Streaming variant of chat_ai (newline-delimited JSON).
+
+    Emits {"type": "token", "content": ...} as tokens arrive from Groq, then
+    one final {"type": "done", "reply", "suggested_destinations",
+    "trip_created"} event with the same fields chat_ai returns.
+    """
+    authorize_user(claims, user_id)
+
+    message = data.get("message")
+    user_id = _normalize_user_id(user_id)
+
+    async def events():
+        if not message:
+            yield _ndjson({"type": "done", **_chat_response("Please enter a message.")})
+            return
+
+        try:
+            await _sync_matcher(catalog)
+            is_trip_request, chosen_destination = _detect_trip(message)
+            context_prompt = await _build_context(user_id, claims, repository)
+
+            prompt_key = _cache_key(message, context_prompt)
+            if is_trip_request:
+                chat_cache.record_bypass()
+            else:
+                cached_reply = chat_cache.get(prompt_key)
+                if cached_reply is not None:
+                    yield _ndjson({"type": "token", "content": cached_reply})
+                    yield _ndjson({"type": "done", **_chat_response(cached_reply)})
+                    return
+
+            # 🛡 SAFE GROQ STREAM
+            parts = []
+            try:
+                stream = llm_gateway.stream(
+                    lambda: client.chat.completions.create(
+                        model=GROQ_MODEL,
+                        messages=_llm_messages(context_prompt, message),
+                        temperature=0.7,
+                        max_tokens=300,
+                        stream=True
+                    )
+                )
+
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        parts.append(content)
+                        yield _ndjson({"type": "token", "content": content})
+
+            except Exception as groq_error:
+                logger.warning("Groq call failed", extra={"event": "chat_llm_error", "error": str(groq_error)})
+                yield _ndjson({"type": "done", **_chat_response(UNAVAILABLE_REPLY)})
+                return
+
+            reply = "".join(parts).strip()
+            created_trip = None
+
+            if not is_trip_request and reply:
+                chat_cache.put(prompt_key, reply)
+
+            if is_trip_request and chosen_destination:
+                created_trip = _queue_trip(jobs, user_id, chosen_destination, repository)
+
+            yield _ndjson({"type": "done", **_chat_response(reply if reply else FALLBACK_REPLY, created_trip)})
+
+        except Exception as e:
+            logger.exception("Chat request failed", extra={"event": "chat_error"})
+            yield _ndjson({"type": "done", **_chat_response(ERROR_REPLY)})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.get("/ai/jobs/{job_id}")
+async def get_chat_job(job_id: str, jobs: JobQueue = Depends(get_job_queue)):
+    """
+    Look up a background job, e.g. the trip referenced by trip_created.job_id.
+    """
+    job = jobs.get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job.to_dict()
@@ -1,14 +1,74 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from database import create_repository
+from cache import CatalogCache
+from ranking import RecommendationEngine
+from models import password_hasher
+from metrics import MetricsMiddleware, configure_access_log, configure_app_log, metrics_registry
+from compression import CompressionMiddleware
+from jobs import JobQueue
+from trip_status import TRIP_STATUS_SCHEDULER, TripStatusReconciler
+from tokens import check_token_config
 from auth import router as auth_router
-from recommendations import router as recommendations_router
-from ai_chat import router as ai_router
+from recommendations import router as recommendations_router, load_catalog
+from ai_chat import router as ai_router, llm_gateway
 from trips import router as trips_router
 from admin import router as admin_router
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_token_config()
 
-app = FastAPI(title="Travel Agent API", version="1.0.0")
+    # 🔌 One pooled PostgREST client shared by every router
+    repository = create_repository()
+    app.state.repository = repository
+
+    # 🗺️ Shared destinations catalog cache
+    app.state.catalog = None
+    # 🎯 Per-user preference ranking
+    app.state.recommender = None
+    # 🗓️ Scheduled trip status reconciliation
+    app.state.trip_status = None
+    if repository is not None:
+        app.state.catalog = CatalogCache(lambda: load_catalog(repository))
+        app.state.recommender = RecommendationEngine(repository)
+        app.state.trip_status = TripStatusReconciler(repository)
+        if TRIP_STATUS_SCHEDULER:
+            app.state.trip_status.start()
+
+    # 📬 Background queue for side-effect writes (e.g. chat trip creation)
+    app.state.jobs = JobQueue()
+    app.state.jobs.start()
+
+    # 📈 Gauges read at scrape time
+    metrics_registry.gauge("job_queue_depth", "Jobs waiting in the background queue.", lambda: app.state.jobs.stats()["depth"])
+    metrics_registry.gauge("password_hash_queue_depth", "bcrypt calls waiting for a worker.", lambda: password_hasher.stats()["queue_depth"])
+    metrics_registry.gauge("llm_active_calls", "Groq calls in flight.", lambda: llm_gateway.active)
+    metrics_registry.gauge("llm_breaker_open", "1 while the Groq circuit breaker is open.", lambda: llm_gateway.breaker.state == "open")
+
+    yield
+
+    await app.state.jobs.drain()
+    if app.state.trip_status is not None:
+        await app.state.trip_status.stop()
+    if repository is not None:
+        await repository.aclose()
+    password_hasher.shutdown()
+
+
+# ⚡ Routes that return plain dicts are rendered with orjson
+app = FastAPI(
+    title="Travel Agent API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+configure_access_log()
+configure_app_log()
 
 # ✅ ADD CORS (IMPORTANT)
 app.add_middleware(
@@ -19,6 +79,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 🗜️ gzip/brotli for large JSON responses (Accept-Encoding negotiated, small bodies skipped)
+app.add_middleware(CompressionMiddleware)
+
+# 📈 Per-route latency, status codes and in-flight requests (outermost, so it sees everything)
+app.add_middleware(MetricsMiddleware)
+
 # Include authentication router
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 
@@ -40,3 +106,11 @@ async def root():
         "message": "Travel Agent API is running",
         "version": "1.0.0"
     }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus scrape endpoint.
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,52 +1,78 @@
-from fastapi import APIRouter, HTTPException, status
-from schemas import SignUpSchema, SignInSchema
-from database import supabase
-from models import hash_password, verify_password
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from schemas import (
+    SignUpSchema, SignInSchema, PreferencesSchema, RefreshSchema,
+    SignUpResponse, SignInResponse, TokenPairResponse, UserProfileResponse, PreferencesResponse
+)
+from database import get_repository
+from repository import RepositoryError, SupabaseRepository
+from ranking import RecommendationEngine, get_recommender
+from models import PasswordQueueFull, password_hasher
+from projections import projection
+from tokens import TokenError, authorize_user, get_token_claims, token_service
+from rate_limit import rate_limit
 
 router = APIRouter()
 
+# Postgres unique_violation, surfaced by PostgREST as 409
+UNIQUE_VIOLATION = "23505"
 
-@router.post("/signup")
-async def signup(user_data: SignUpSchema):
+
+def _conflict_detail(error: RepositoryError) -> Optional[str]:
+    """
+    Map a unique-constraint failure on insert to the signup error message.
+    Other conflicts (e.g. foreign key violations, also 409) return None.
+    """
+    if error.code != UNIQUE_VIOLATION:
+        return None
+
+    text = f"{error} {error.details or ''}".lower()
+    if "username" in text:
+        return "Username already exists"
+    if "email" in text:
+        return "Email already exists"
+    return "Username or email already exists"
+
+
+@router.post("/signup", response_model=SignUpResponse, dependencies=[Depends(rate_limit("auth.signup"))])
+async def signup(user_data: SignUpSchema, repository: SupabaseRepository = Depends(get_repository)):
     """
     Register a new user.
     """
 
     try:
-        # 1️⃣ Check if username already exists
-        username_check = supabase.table("users") \
-            .select("id") \
-            .eq("username", user_data.username) \
-            .execute()
+        # 1️⃣ Check username and email in one query while bcrypt hashes the password
+        existing, hashed_password = await asyncio.gather(
+            repository.find_users_by_username_or_email(user_data.username, user_data.email, projection("auth.signup")),
+            password_hasher.hash(user_data.password)
+        )
 
-        if username_check.data:
+        if any(user.get("username") == user_data.username for user in existing):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already exists"
             )
 
-        # 2️⃣ Check if email already exists
-        email_check = supabase.table("users") \
-            .select("id") \
-            .eq("email", user_data.email) \
-            .execute()
-
-        if email_check.data:
+        if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already exists"
             )
 
-        # 3️⃣ Hash password
-        hashed_password = hash_password(user_data.password)
-
-        # 4️⃣ Insert user
-        supabase.table("users").insert({
-            "display_name": user_data.display_name,
-            "username": user_data.username,
-            "email": user_data.email,
-            "password_hash": hashed_password
-        }).execute()
+        # 2️⃣ Insert user (unique indexes still catch a concurrent signup)
+        try:
+            await repository.insert_user({
+                "display_name": user_data.display_name,
+                "username": user_data.username,
+                "email": user_data.email,
+                "password_hash": hashed_password
+            })
+        except RepositoryError as e:
+            detail = _conflict_detail(e)
+            if detail is None:
+                raise
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
 
         return {
             "message": "User created successfully",
@@ -59,6 +85,12 @@ async def signup(user_data: SignUpSchema):
 
     except HTTPException:
         raise
+    except PasswordQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -66,32 +98,32 @@ async def signup(user_data: SignUpSchema):
         )
 
 
-@router.post("/signin")
-async def signin(credentials: SignInSchema):
+@router.post(
+    "/signin",
+    response_model=SignInResponse,
+    response_model_exclude_unset=True,
+    dependencies=[Depends(rate_limit("auth.signin"))],
+)
+async def signin(credentials: SignInSchema, repository: SupabaseRepository = Depends(get_repository)):
     """
     Sign in an existing user.
     """
     try:
-        result = supabase.table("users") \
-            .select("*") \
-            .eq("username", credentials.username) \
-            .execute()
+        user = await repository.get_user_by_username(credentials.username, projection("auth.signin"))
 
-        if not result.data:
+        if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid username or password"
             )
 
-        user = result.data[0]
-
-        if not verify_password(credentials.password, user["password_hash"]):
+        if not await password_hasher.verify(credentials.password, user["password_hash"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid username or password"
             )
 
-        return {
+        response = {
             "message": "Sign in successful",
             "user": {
                 "id": user["id"],
@@ -101,8 +133,20 @@ async def signin(credentials: SignInSchema):
             }
         }
 
+        # 🔑 Signed session tokens (user ID + preferences for chat context)
+        if token_service.enabled:
+            response.update(token_service.issue_pair(user))
+
+        return response
+
     except HTTPException:
         raise
+    except PasswordQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -110,25 +154,66 @@ async def signin(credentials: SignInSchema):
         )
 
 
-@router.get("/user/{user_id}")
-async def get_user_profile(user_id: int):
+@router.post("/refresh", response_model=TokenPairResponse)
+async def refresh_tokens(body: RefreshSchema, repository: SupabaseRepository = Depends(get_repository)):
+    """
+    Exchange a refresh token for a new access/refresh token pair.
+    """
+    if not token_service.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Token sessions are not enabled"
+        )
+
+    try:
+        claims = token_service.decode(body.refresh_token, "refresh")
+    except TokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Invalid refresh token: {e}"
+        )
+
+    try:
+        # Re-read the user so the new access token carries current preferences
+        user = await repository.get_user_by_id(claims["sub"], projection("auth.refresh"))
+
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User no longer exists"
+            )
+
+        return token_service.issue_pair(user)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Token refresh failed: {str(e)}"
+        )
+
+
+@router.get("/user/{user_id}", response_model=UserProfileResponse)
+async def get_user_profile(
+    user_id: int,
+    repository: SupabaseRepository = Depends(get_repository),
+    claims: Optional[dict] = Depends(get_token_claims),
+):
     """
     Get user profile information by user ID.
     """
+    authorize_user(claims, user_id)
+
     try:
-        result = supabase.table("users") \
-            .select("id, username, email, display_name, created_at, preferred_budget, preferred_activities, preferred_regions") \
-            .eq("id", user_id) \
-            .execute()
+        user = await repository.get_user_by_id(user_id, projection("auth.profile"))
 
-        if not result.data:
+        if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
 
-        user = result.data[0]
-        
         return {
             "id": user["id"],
             "username": user["username"],
@@ -147,3 +232,48 @@ async def get_user_profile(user_id: int):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch user profile: {str(e)}"
         )
+
+
+@router.put("/user/{user_id}/preferences", response_model=PreferencesResponse, response_model_exclude_unset=True)
+async def update_user_preferences(
+    user_id: int,
+    preferences: PreferencesSchema,
+    repository: SupabaseRepository = Depends(get_repository),
+    recommender: RecommendationEngine = Depends(get_recommender),
+    claims: Optional[dict] = Depends(get_token_claims),
+):
+    """
+    Update a user's stored travel preferences used for recommendations.
+    Returns a fresh token pair so the new preferences reach token holders.
+    """
+    authorize_user(claims, user_id)
+
+    try:
+        result = await repository.update_user(user_id, preferences.model_dump(), projection("auth.preferences"))
+
+        if not result:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+
+        # 🎯 Drop the cached ranking so the next recommendations call re-scores
+        recommender.invalidate(user_id)
+
+        response = {
+            "message": "Preferences updated",
+            "preferences": preferences.model_dump()
+        }
+
+        if token_service.enabled:
+            response.update(token_service.issue_pair(result[0]))
+
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update preferences: {str(e)}"
+        )
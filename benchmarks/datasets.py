@@ -0,0 +1,91 @@
+"""
+Deterministic synthetic tables for the benchmark fakes.
+"""
+import random
+from datetime import date, timedelta
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+COUNTRIES = (
+    "Japan", "France", "Italy", "Indonesia", "Iceland", "Switzerland",
+    "Thailand", "Peru", "Morocco", "Canada", "Brazil", "Kenya",
+)
+BUDGETS = ("low", "moderate", "high", "premium")
+STYLES = ("adventure", "culture", "relaxation", "nature", "nightlife", "food")
+ACTIVITIES = ("hiking", "museums", "beaches", "temples", "food tours", "skiing", "diving", "shopping")
+STATUSES = ("wishlist", "planning", "upcoming", "ongoing", "completed", "cancelled")
+
+# Trip dates are spread around this day (not date.today()), so a seed gives
+# the same tables on every run
+BASE_DATE = date(2026, 1, 1)
+
+
+def make_destinations(count: int, rng: random.Random) -> list:
+    destinations = []
+    for index in range(1, count + 1):
+        country = rng.choice(COUNTRIES)
+        destinations.append({
+            "id": index,
+            "name": f"{country} Spot {index}",
+            "country": country,
+            "description": "A place worth the trip. " * 4,
+            "activities": rng.sample(ACTIVITIES, 3),
+            "travel_style": rng.choice(STYLES),
+            "budget": rng.choice(BUDGETS),
+            "activity_tags": rng.sample(STYLES, 2),
+            "active": rng.random() > 0.05,
+        })
+    return destinations
+
+
+def make_users(count: int, password_hash: str, rng: random.Random) -> list:
+    users = []
+    for index in range(1, count + 1):
+        users.append({
+            "id": index,
+            "username": f"user{index}",
+            "email": f"user{index}@example.com",
+            "display_name": f"User {index}",
+            "password_hash": password_hash,
+            "created_at": f"2025-01-{index % 28 + 1:02d}T00:00:00+00:00",
+            # A quarter of users never set preferences
+            "preferred_budget": rng.choice(BUDGETS) if index % 4 else None,
+            "preferred_activities": rng.sample(STYLES, 2) if index % 4 else [],
+            "preferred_regions": rng.sample(COUNTRIES, 2) if index % 4 else [],
+        })
+    return users
+
+
+def make_trips(count: int, users: int, rng: random.Random, base_date: date = BASE_DATE) -> list:
+    trips = []
+    for index in range(1, count + 1):
+        start = base_date + timedelta(days=rng.randint(-365, 365))
+        end = start + timedelta(days=rng.randint(0, 14))
+        country = rng.choice(COUNTRIES)
+        trips.append({
+            "id": index,
+            "user_id": str(rng.randint(1, users)),
+            "destination": f"{country} Spot {rng.randint(1, 1000)}",
+            "destination_id": None,
+            "country": country,
+            "trip_date": str(start),
+            "start_date": str(start),
+            "end_date": str(end),
+            "image": "https://example.com/" + "i" * 80,
+            "description": "Trip notes. " * 20,
+            "activities": rng.sample(ACTIVITIES, 3),
+            "status": rng.choice(STATUSES),
+        })
+    return trips
+
+
+def build_tables(
+    destinations: int, users: int, trips: int, password_hash: str, seed: int = 1, base_date: date = BASE_DATE
+) -> dict:
+    rng = random.Random(seed)
+    return {
+        "destinations": make_destinations(destinations, rng),
+        "users": make_users(users, password_hash, rng),
+        "trips": make_trips(trips, users, rng, base_date),
+        "user_preferences": [],
+    }
@@ -0,0 +1,56 @@
+"""
+In-process stand-in for the AsyncGroq client used by ai_chat.
+
+Only `client.chat.completions.create(...)` is implemented, with and
+without `stream=True`. Latency is simulated with asyncio.sleep, so many
+concurrent calls overlap like real network calls.
+"""
+import asyncio
+import random
+from types import SimpleNamespace
+
+DEFAULT_REPLY = "1. Kyoto Temples\n2. Tokyo Nightlife\n3. Osaka Street Food\n4. Nara Park\n5. Mount Fuji Views"
+
+
+class FakeGroq:
+    def __init__(
+        self,
+        latency: float = 0.3,
+        first_token_latency: float = 0.1,
+        chunks: int = 20,
+        jitter: float = 0.0,
+        reply: str = DEFAULT_REPLY,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.first_token_latency = first_token_latency
+        self.chunks = chunks
+        self.jitter = jitter
+        self.reply = reply
+        self.calls = 0
+        self._random = random.Random(seed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _delay(self, seconds: float) -> float:
+        return seconds + self._random.uniform(0, self.jitter)
+
+    async def _create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        self.calls += 1
+        if stream:
+            return self._stream()
+
+        await asyncio.sleep(self._delay(self.latency))
+        message = SimpleNamespace(content=self.reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def _stream(self):
+        await asyncio.sleep(self._delay(self.first_token_latency))
+
+        words = self.reply.split(" ")
+        size = max(1, len(words) // max(1, self.chunks))
+        pieces = [" ".join(words[i:i + size]) + " " for i in range(0, len(words), size)]
+        remaining = max(0.0, self.latency - self.first_token_latency)
+
+        for piece in pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+            await asyncio.sleep(remaining / len(pieces))
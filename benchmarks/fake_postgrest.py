@@ -0,0 +1,319 @@
+"""
+In-process PostgREST stand-in for benchmarks.
+
+Implements the subset of the PostgREST REST syntax SupabaseRepository
+uses (eq/in/gt/gte/lt/lte/is/ilike filters, not., or=()/and=() groups,
+order, limit, select, Prefer: return=/count=) over plain Python lists.
+Plug it into SupabaseRepository with `FakePostgrest.client()`.
+
+Equality lookups on id, user_id, username, email and active go through
+hash indexes so a 100k-row trips table does not turn every request into
+a full scan of the fake itself.
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+
+import httpx
+
+INDEXED_COLUMNS = ("id", "user_id", "username", "email", "active")
+
+# Postgres unique constraints the app relies on
+UNIQUE_COLUMNS = {"users": ("username", "email")}
+
+# Column defaults applied to inserted rows that leave the column out
+COLUMN_DEFAULTS = {"trips": {"activities": (), "status": "planning"}}
+
+
+def _literal(value: str):
+    if value == "true":
+        return True
+    if value == "false":
+        return False
+    if value == "null":
+        return None
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _key(value):
+    """
+    Comparable key: numbers compare numerically, everything else as text.
+    """
+    if isinstance(value, bool):
+        return (0, int(value))
+    if isinstance(value, (int, float)):
+        return (0, value)
+    try:
+        return (0, float(value))
+    except (TypeError, ValueError):
+        return (1, str(value))
+
+
+def _like_regex(pattern: str) -> str:
+    """
+    LIKE pattern to regex: "*" (PostgREST's URL form) and "%" match any run,
+    "_" one character, and a backslash makes the next character literal.
+    """
+    regex, escaped = "", False
+    for char in pattern:
+        if escaped:
+            regex += re.escape(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in "*%":
+            regex += ".*"
+        elif char == "_":
+            regex += "."
+        else:
+            regex += re.escape(char)
+    return regex
+
+
+def _split_top(body: str) -> list:
+    """
+    Split "a,b(c,d),\"e,f\"" on top-level commas.
+    """
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in body:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _compile_condition(column: str, expression: str):
+    operator, _, value = expression.partition(".")
+    negate = operator == "not"
+    if negate:
+        operator, _, value = value.partition(".")
+
+    if operator == "eq":
+        target = _literal(value)
+        test = lambda v: v is not None and (v == target if isinstance(target, bool) else str(v) == str(target))
+    elif operator == "in":
+        items = {str(_literal(item)) for item in _split_top(value[1:-1])}
+        test = lambda v: v is not None and str(v) in items
+    elif operator in ("gt", "gte", "lt", "lte"):
+        bound = _key(_literal(value))
+        compare = {
+            "gt": lambda k: k > bound,
+            "gte": lambda k: k >= bound,
+            "lt": lambda k: k < bound,
+            "lte": lambda k: k <= bound,
+        }[operator]
+        test = lambda v: v is not None and compare(_key(v))
+    elif operator == "is":
+        target = _literal(value)
+        test = lambda v: v is target if target is None else v == target
+    elif operator == "ilike":
+        pattern = re.compile("^" + _like_regex(str(_literal(value))) + "$", re.IGNORECASE)
+        test = lambda v: v is not None and pattern.match(str(v)) is not None
+    else:
+        raise ValueError(f"Unsupported operator: {operator}")
+
+    return (lambda row: not test(row.get(column))) if negate else (lambda row: test(row.get(column)))
+
+
+def _compile_group(kind: str, body: str):
+    conditions = []
+    for part in _split_top(body[1:-1]):
+        if part.startswith(("and(", "or(")):
+            inner_kind = part[:part.index("(")]
+            conditions.append(_compile_group(inner_kind, part[len(inner_kind):]))
+        else:
+            column, _, expression = part.partition(".")
+            conditions.append(_compile_condition(column, expression))
+
+    if kind == "and":
+        return lambda row: all(condition(row) for condition in conditions)
+    return lambda row: any(condition(row) for condition in conditions)
+
+
+class FakePostgrest:
+    def __init__(self, tables: dict = None, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.tables = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._indexes = {}
+        self._ids = itertools.count(10_000_000)
+
+    def client(self) -> httpx.AsyncClient:
+        # Look handle up per request so tests can wrap it after the client exists
+        return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: self.handle(request)))
+
+    # ---------- indexes ----------
+    def _index(self, table: str, column: str) -> dict:
+        key = (table, column)
+        index = self._indexes.get(key)
+        if index is None:
+            index = {}
+            for row in self.tables.get(table, []):
+                index.setdefault(str(row.get(column)), []).append(row)
+            self._indexes[key] = index
+        return index
+
+    def _invalidate(self, table: str):
+        for key in [key for key in self._indexes if key[0] == table]:
+            del self._indexes[key]
+
+    # ---------- query ----------
+    def _candidates(self, table: str, filters: list) -> list:
+        for column, expression in filters:
+            if column in INDEXED_COLUMNS and expression.startswith("eq."):
+                value = _literal(expression[3:])
+                if isinstance(value, bool):
+                    value = str(value)
+                return self._index(table, column).get(str(value), [])
+        return self.tables.get(table, [])
+
+    def _match(self, table: str, params: list) -> list:
+        filters = [
+            (column, value) for column, value in params
+            if column not in ("select", "order", "limit", "offset", "columns")
+        ]
+        conditions = []
+        for column, value in filters:
+            if column in ("or", "and"):
+                conditions.append(_compile_group(column, value))
+            else:
+                conditions.append(_compile_condition(column, value))
+
+        rows = self._candidates(table, filters)
+        return [row for row in rows if all(condition(row) for condition in conditions)]
+
+    @staticmethod
+    def _order(rows: list, order: str) -> list:
+        for spec in reversed(order.split(",")):
+            column, *modifiers = spec.split(".")
+            descending = "desc" in modifiers
+            nulls_first = "nullsfirst" in modifiers or (descending and "nullslast" not in modifiers)
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present.sort(key=lambda row: _key(row[column]), reverse=descending)
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    @staticmethod
+    def _project(rows: list, select: str) -> list:
+        if not select or select == "*":
+            return [dict(row) for row in rows]
+        columns = select.split(",")
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    def _error(self, status: int, code: str, message: str) -> httpx.Response:
+        return httpx.Response(status, json={"code": code, "message": message, "details": None})
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+
+        table = request.url.path.rsplit("/", 1)[-1]
+        params = list(request.url.params.multi_items())
+        query = dict(params)
+        prefer = request.headers.get("prefer", "")
+        representation = "return=representation" in prefer
+
+        try:
+            if request.method == "GET":
+                rows = self._match(table, params)
+                if "order" in query:
+                    rows = self._order(rows, query["order"])
+                total = len(rows)
+                offset = int(query.get("offset", 0))
+                limit = query.get("limit")
+                rows = rows[offset: offset + int(limit)] if limit else rows[offset:]
+
+                headers = {}
+                if "count=" in prefer:
+                    end = offset + len(rows) - 1
+                    headers["content-range"] = f"{offset}-{end}/{total}" if rows else f"*/{total}"
+                return httpx.Response(200, json=self._project(rows, query.get("select")), headers=headers)
+
+            if request.method == "POST":
+                body = json.loads(request.content)
+                items = body if isinstance(body, list) else [body]
+                existing = self.tables.setdefault(table, [])
+                for column in UNIQUE_COLUMNS.get(table, ()):
+                    index = self._index(table, column)
+                    seen = set()
+                    for item in items:
+                        value = str(item.get(column))
+                        if value in index or value in seen:
+                            return self._error(
+                                409, "23505",
+                                f'duplicate key value violates unique constraint "{table}_{column}_key"'
+                            )
+                        seen.add(value)
+
+                # With ?columns=, a listed key a row lacks is NULL unless Prefer: missing=default
+                columns = query["columns"].split(",") if "columns" in query else None
+                use_defaults = columns is None or "missing=default" in prefer
+
+                # ?on_conflict= with Prefer: resolution=ignore-duplicates skips rows whose
+                # key exists, resolution=merge-duplicates updates them instead
+                conflict_column = query.get("on_conflict") if "resolution=" in prefer else None
+                conflicts = self._index(table, conflict_column) if conflict_column else {}
+
+                created = []
+                for item in items:
+                    matches = conflicts.get(str(item.get(conflict_column))) if conflict_column else None
+                    if matches:
+                        if "resolution=merge-duplicates" in prefer:
+                            for row in matches:
+                                row.update(item)
+                            created.extend(matches)
+                        continue
+                    row = dict(item) if columns is None else {column: item.get(column) for column in columns}
+                    if use_defaults:
+                        row = {column: value for column, value in row.items() if column in item}
+                        for column, default in COLUMN_DEFAULTS.get(table, {}).items():
+                            row.setdefault(column, list(default) if isinstance(default, tuple) else default)
+                    row.setdefault("id", next(self._ids))
+                    existing.append(row)
+                    created.append(row)
+                self._invalidate(table)
+                if not representation:
+                    return httpx.Response(201)
+                return httpx.Response(201, json=self._project(created, query.get("select")))
+
+            if request.method == "PATCH":
+                body = json.loads(request.content)
+                rows = self._match(table, params)
+                for row in rows:
+                    row.update(body)
+                self._invalidate(table)
+                if not representation:
+                    return httpx.Response(204)
+                return httpx.Response(200, json=self._project(rows, query.get("select")))
+
+            if request.method == "DELETE":
+                doomed = {id(row) for row in self._match(table, params)}
+                rows = [row for row in self.tables.get(table, []) if id(row) in doomed]
+                self.tables[table] = [row for row in self.tables.get(table, []) if id(row) not in doomed]
+                self._invalidate(table)
+                if not representation:
+                    return httpx.Response(204)
+                return httpx.Response(200, json=self._project(rows, query.get("select")))
+
+        except ValueError as e:
+            return self._error(400, "PGRST100", str(e))
+
+        return self._error(405, "PGRST105", f"Unsupported method {request.method}")
@@ -0,0 +1,272 @@
+"""
+Benchmark the FastAPI app in-process against fake Supabase and Groq backends.
+
+    python -m benchmarks.run --workload mixed --requests 2000 --concurrency 32
+    python -m benchmarks.run --destinations 10000 --trips 100000 --db-latency-ms 3 \\
+        --llm-latency-ms 400 --output results.json
+
+Requests go through httpx.ASGITransport straight into `app`, so there is
+no socket or server process in the measurement. The app's shared state
+(repository, caches, job queue) is installed directly on `app.state`
+instead of running the lifespan, with the repository pointed at
+FakePostgrest and ai_chat.client replaced by FakeGroq.
+
+The request schedule and the tables are generated from --seed (trip dates
+from --base-date, not today), so two runs with the same arguments send the
+same requests in the same order against the same data. Results (p50/p95/p99
+latency in ms and requests per second, overall and per endpoint) are
+printed as JSON for comparison across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import date
+
+# Must be set before the app modules are imported
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("ACCESS_LOG", "0")
+# Every benchmark request comes from one client IP
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+import httpx
+
+import ai_chat
+from app import app
+from cache import CatalogCache
+from jobs import JobQueue
+from models import hash_password
+from ranking import RecommendationEngine
+from recommendations import load_catalog
+from repository import SupabaseRepository
+from trip_status import TripStatusReconciler
+
+from benchmarks.datasets import BASE_DATE, BENCHMARK_PASSWORD, build_tables
+from benchmarks.fake_llm import FakeGroq
+from benchmarks.fake_postgrest import FakePostgrest
+
+# Relative weights of each request type per workload
+WORKLOADS = {
+    "mixed": {
+        "recommendations": 35,
+        "recommendations_page": 10,
+        "trips": 20,
+        "trips_summary": 10,
+        "signin": 10,
+        "chat": 10,
+        "chat_stream": 5,
+    },
+    "recommendations": {"recommendations": 3, "recommendations_page": 1},
+    "trips": {"trips": 1, "trips_summary": 1},
+    "signin": {"signin": 1},
+    "chat": {"chat": 2, "chat_stream": 1},
+}
+
+# Prompts repeated across users, so the chat cache sees realistic hits
+COMMON_PROMPTS = (
+    "Suggest places in Japan",
+    "What should I pack for Iceland?",
+    "Best food in Italy",
+    "Things to do in Paris",
+    "Is Bali good in December?",
+)
+
+
+def build_request(kind: str, rng: random.Random, config: argparse.Namespace, sequence: int) -> tuple:
+    user_id = rng.randint(1, config.users)
+
+    if kind == "recommendations":
+        return "GET", f"/recommendations/{user_id}", {}
+    if kind == "recommendations_page":
+        return "GET", f"/recommendations/{user_id}", {"params": {"limit": 20}}
+    if kind == "trips":
+        return "GET", f"/trips/{user_id}", {}
+    if kind == "trips_summary":
+        return "GET", f"/trips/{user_id}", {"params": {"summary": "true", "limit": 20}}
+    if kind == "signin":
+        return "POST", "/auth/signin", {"json": {"username": f"user{user_id}", "password": BENCHMARK_PASSWORD}}
+
+    if rng.random() < config.chat_repeat:
+        message = rng.choice(COMMON_PROMPTS)
+    else:
+        message = f"Tell me something about travel idea number {sequence}"
+    path = f"/ai/chat/{user_id}" + ("/stream" if kind == "chat_stream" else "")
+    return "POST", path, {"json": {"message": message}}
+
+
+def build_schedule(config: argparse.Namespace) -> list:
+    rng = random.Random(config.seed)
+    weights = WORKLOADS[config.workload]
+    kinds = list(weights)
+    total = config.warmup + config.requests
+    chosen = rng.choices(kinds, weights=[weights[kind] for kind in kinds], k=total)
+    return [(kind, *build_request(kind, rng, config, sequence)) for sequence, kind in enumerate(chosen)]
+
+
+def install_fakes(fake_db: FakePostgrest, fake_llm: FakeGroq) -> SupabaseRepository:
+    """
+    Put the same shared objects the lifespan would create on app.state,
+    backed by the fakes.
+    """
+    repository = SupabaseRepository("http://fake-postgrest", "benchmark", client=fake_db.client())
+
+    app.state.repository = repository
+    app.state.catalog = CatalogCache(lambda: load_catalog(repository))
+    app.state.recommender = RecommendationEngine(repository)
+    app.state.jobs = JobQueue()
+    app.state.jobs.start()
+    # Reads return stored statuses; the scheduled reconciler is not needed here
+    app.state.trip_status = TripStatusReconciler(repository)
+
+    ai_chat.client = fake_llm
+    return repository
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(q * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    latencies = sorted(latency for _, latency in samples)
+    statuses = {}
+    for status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {
+        "requests": len(samples),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "status_codes": statuses,
+        "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def drive(client: httpx.AsyncClient, schedule: list, concurrency: int) -> tuple:
+    """
+    Send `schedule` with `concurrency` closed-loop workers.
+    Returns ({kind: [(status, seconds)]}, wall-clock seconds).
+    """
+    results = {}
+    position = 0
+
+    async def worker():
+        nonlocal position
+        while position < len(schedule):
+            kind, method, url, options = schedule[position]
+            position += 1
+            started_at = time.perf_counter()
+            try:
+                response = await client.request(method, url, **options)
+                status = response.status_code
+            except Exception:
+                status = "exception"
+            results.setdefault(kind, []).append((status, time.perf_counter() - started_at))
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started_at
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(config: argparse.Namespace) -> dict:
+    # One real bcrypt hash shared by every user keeps setup fast; signin still verifies at full cost
+    tables = build_tables(
+        config.destinations,
+        config.users,
+        config.trips,
+        hash_password(BENCHMARK_PASSWORD),
+        seed=config.seed,
+        base_date=date.fromisoformat(config.base_date),
+    )
+    fake_db = FakePostgrest(
+        tables, latency=config.db_latency_ms / 1000, jitter=config.db_jitter_ms / 1000, seed=config.seed
+    )
+    fake_llm = FakeGroq(
+        latency=config.llm_latency_ms / 1000,
+        first_token_latency=config.llm_first_token_ms / 1000,
+        jitter=config.llm_jitter_ms / 1000,
+        seed=config.seed,
+    )
+    repository = install_fakes(fake_db, fake_llm)
+    schedule = build_schedule(config)
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            await drive(client, schedule[:config.warmup], config.concurrency)
+
+            db_before, llm_before = fake_db.requests, fake_llm.calls
+            results, elapsed = await drive(client, schedule[config.warmup:], config.concurrency)
+            db_requests, llm_calls = fake_db.requests - db_before, fake_llm.calls - llm_before
+    finally:
+        await app.state.jobs.drain()
+        await repository.aclose()
+
+    every_sample = [sample for samples in results.values() for sample in samples]
+    return {
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "config": vars(config),
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(every_sample, elapsed),
+        "endpoints": {kind: summarize(samples, elapsed) for kind, samples in sorted(results.items())},
+        "backend": {
+            "db_requests": db_requests,
+            "db_requests_per_request": round(db_requests / len(every_sample), 3) if every_sample else 0.0,
+            "llm_calls": llm_calls,
+        },
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="mixed")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests sent first")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--base-date", default=str(BASE_DATE), help="YYYY-MM-DD that trip dates are spread around")
+    parser.add_argument("--destinations", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--trips", type=int, default=20000)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    parser.add_argument("--db-jitter-ms", type=float, default=1.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-first-token-ms", type=float, default=80.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--chat-repeat", type=float, default=0.5, help="share of chat prompts drawn from a common pool")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    config = parse_args()
+    report = asyncio.run(main(config))
+    text = json.dumps(report, indent=2)
+
+    if config.output:
+        with open(config.output, "w") as handle:
+            handle.write(text + "\n")
+        print(f"Wrote {config.output}", file=sys.stderr)
+    else:
+        print(text)
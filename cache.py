@@ -0,0 +1,234 @@
+import asyncio
+import os
+import time
+import orjson
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from fastapi import HTTPException, Request, status
+from http_cache import etag_for, json_array
+from compression import compress_variants
+from catalog_index import DestinationIndex
+
+# How long the destinations catalog stays fresh, in seconds
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+# How long browsers may reuse the catalog before revalidating, in seconds
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+
+
+class CatalogCache:
+    """
+    In-process TTL cache for the active destinations catalog.
+
+    Every user gets the same catalog, so one copy is kept in memory and
+    refreshed at most once per TTL. Concurrent misses share a single
+    refresh (single-flight) instead of all hitting the database. Admin
+    writes call `invalidate()` so changes show up immediately.
+
+    `etag` is the content hash of the current copy and `index` its
+    filtering index. `rows` holds each destination already serialized to
+    JSON and `body` the whole catalog, so hot responses are sent as bytes
+    without re-encoding; `variants` holds `body` already gzip/brotli
+    compressed. All of them are built once per refresh.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[list]], ttl: float = CATALOG_CACHE_TTL):
+        self._loader = loader
+        self.ttl = ttl
+        self._destinations = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+        self.version = 0
+        self.etag = None
+        self.index = DestinationIndex([])
+        self.rows = []
+        self.body = b"[]"
+        self.variants = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.invalidations = 0
+
+    def _is_fresh(self) -> bool:
+        return self._destinations is not None and time.monotonic() < self._expires_at
+
+    async def get(self) -> list:
+        """
+        Return the cached catalog, refreshing it if it has expired.
+        """
+        if self._is_fresh():
+            self.hits += 1
+            return self._destinations
+
+        async with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            if self._is_fresh():
+                self.hits += 1
+                return self._destinations
+
+            self.misses += 1
+            generation = self._generation
+            destinations = await self._loader()
+
+            rows = [orjson.dumps(destination) for destination in destinations]
+            body = json_array(rows)
+            # Dense compression of a multi-MB catalog takes a while; keep it off the event loop
+            variants = await asyncio.to_thread(compress_variants, body)
+
+            self._destinations = destinations
+            self.rows = rows
+            self.body = body
+            self.variants = variants
+            self.etag = etag_for(body)
+            self.index = DestinationIndex(destinations)
+            self.version += 1
+            self.refreshes += 1
+
+            # An admin write landed mid-refresh: serve this copy once but
+            # reload on the next request
+            if generation == self._generation:
+                self._expires_at = time.monotonic() + self.ttl
+            else:
+                self._expires_at = 0.0
+
+            return destinations
+
+    def encoded_body(self, encoding: Optional[str]) -> tuple:
+        """
+        Return (body, content_encoding) for the negotiated encoding, falling
+        back to the uncompressed body when no variant exists.
+        """
+        variant = self.variants.get(encoding) if encoding else None
+        if variant is None:
+            return self.body, None
+        return variant, encoding
+
+    def invalidate(self):
+        """
+        Drop the cached catalog so the next read reloads it.
+        """
+        self._generation += 1
+        self._expires_at = 0.0
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "refreshes": self.refreshes,
+            "invalidations": self.invalidations,
+            "version": self.version,
+            "size": len(self._destinations) if self._destinations is not None else 0,
+            "bytes": len(self.body),
+            "compressed_bytes": {encoding: len(variant) for encoding, variant in self.variants.items()},
+            "ttl_seconds": self.ttl,
+        }
+
+
+class ResponseCache:
+    """
+    LRU cache with per-entry TTL and a total memory budget, for text values.
+
+    Entries larger than `max_entry_bytes` are never stored. When the total
+    estimated size goes over `max_bytes`, least recently used entries are
+    evicted until it fits again.
+    """
+
+    # Rough per-entry bookkeeping cost (tuple, dict slot, key object)
+    ENTRY_OVERHEAD = 120
+
+    def __init__(self, ttl: float, max_bytes: int, max_entry_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        # key -> (expires_at, value, size)
+        self._entries = OrderedDict()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, value: str):
+        size = len(key) + len(value.encode("utf-8")) + self.ENTRY_OVERHEAD
+
+        if size > self.max_entry_bytes:
+            self.rejected += 1
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + self.ttl, value, size)
+        self.bytes += size
+
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def record_bypass(self):
+        self.bypasses += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bypasses": self.bypasses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejected": self.rejected,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+        }
+
+
+def get_catalog_cache(request: Request) -> CatalogCache:
+    """
+    FastAPI dependency returning the shared catalog cache.
+    """
+    catalog = getattr(request.app.state, "catalog", None)
+
+    if catalog is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is not configured"
+        )
+
+    return catalog
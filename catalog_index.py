@@ -0,0 +1,123 @@
+from typing import Iterable, List, Optional, Tuple
+
+
+def _iter_bits(mask: int):
+    """
+    Yield set bit positions of an int bitset in ascending order.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DestinationIndex:
+    """
+    Inverted indexes over the active catalog for server-side filtering.
+
+    Each budget level, activity (travel_style or activity tag) and country
+    maps to a bitset (a Python int) where bit i is set when destination i
+    has that feature. Scoring a query is then a handful of bitwise ops over
+    the whole catalog instead of a per-destination loop, and only the
+    destinations on the requested page are ever decoded.
+
+    Scoring mirrors `applyFilters` in discover.js: +1 for a budget match,
+    +1 for an activity match, +1 for a country match.
+    """
+
+    def __init__(self, destinations: List[dict]):
+        self.destinations = destinations
+        self.all_mask = (1 << len(destinations)) - 1
+        self.budget_bits = {}
+        self.activity_bits = {}
+        self.country_bits = {}
+
+        for position, destination in enumerate(destinations):
+            bit = 1 << position
+
+            budget = destination.get("budget")
+            if budget:
+                key = budget.lower()
+                self.budget_bits[key] = self.budget_bits.get(key, 0) | bit
+
+            activities = set(destination.get("activity_tags") or [])
+            if destination.get("travel_style"):
+                activities.add(destination["travel_style"])
+            for activity in activities:
+                self.activity_bits[activity] = self.activity_bits.get(activity, 0) | bit
+
+            country = destination.get("country")
+            if country:
+                self.country_bits[country] = self.country_bits.get(country, 0) | bit
+
+    @staticmethod
+    def _union(bits: dict, keys: Iterable[str]) -> int:
+        mask = 0
+        for key in keys:
+            mask |= bits.get(key, 0)
+        return mask
+
+    def score_masks(
+        self,
+        budget: Optional[str] = None,
+        activities: Iterable[str] = (),
+        regions: Iterable[str] = (),
+    ) -> List[Tuple[int, int]]:
+        """
+        Split the catalog into score buckets.
+
+        Returns:
+            (score, bitset) pairs from the highest score down to 0
+        """
+        budget_mask = self.budget_bits.get(budget.lower(), 0) if budget else 0
+        activity_mask = self._union(self.activity_bits, activities)
+        region_mask = self._union(self.country_bits, regions)
+
+        three = budget_mask & activity_mask & region_mask
+        two = ((budget_mask & activity_mask) | (budget_mask & region_mask) | (activity_mask & region_mask)) & ~three
+        one = (budget_mask | activity_mask | region_mask) & ~(three | two)
+        zero = self.all_mask & ~(three | two | one)
+
+        return [(3, three), (2, two), (1, one), (0, zero)]
+
+    def rank(
+        self,
+        budget: Optional[str] = None,
+        activities: Iterable[str] = (),
+        regions: Iterable[str] = (),
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[int, int]]:
+        """
+        Return one page of (position, score) pairs, best match first.
+        """
+        return self.page(self.score_masks(budget, activities, regions), offset, limit)
+
+    @staticmethod
+    def page(masks: List[Tuple[int, int]], offset: int = 0, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Decode one page of (position, score) pairs from `score_masks` output.
+
+        Ties keep catalog order, matching the stable sort in discover.js.
+        """
+        stop = None if limit is None else offset + limit
+        ranked = []
+        seen = 0
+
+        for score, mask in masks:
+            if stop is not None and seen >= stop:
+                break
+
+            bucket_size = mask.bit_count()
+            if seen + bucket_size <= offset:
+                seen += bucket_size
+                continue
+
+            for position in _iter_bits(mask):
+                if stop is not None and seen >= stop:
+                    break
+                if seen >= offset:
+                    ranked.append((position, score))
+                seen += 1
+
+        return ranked
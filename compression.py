@@ -0,0 +1,165 @@
+import gzip
+import os
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pinned in requirements.txt; without it everything is gzip
+    brotli = None
+
+# Responses smaller than this (bytes) are sent as-is
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# gzip level 1-9; 6 is the usual size/CPU balance for dynamic responses
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+
+# Brotli quality 0-11 for dynamic responses; 4 compresses better than gzip -6 at similar cost
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Brotli quality for bodies compressed once and reused (the cached catalog)
+BROTLI_STATIC_QUALITY = int(os.getenv("BROTLI_STATIC_QUALITY", "9"))
+
+# Content types worth compressing; event streams must never be buffered
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/javascript", "text/")
+INCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+
+def available_encodings() -> tuple:
+    """
+    Encodings this server can produce, most preferred first.
+    """
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the best encoding the client accepts from its Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        "br", "gzip", or None for an uncompressed response
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in available_encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        # Ties keep server preference order (br before gzip)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+
+    return best
+
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    """
+    Compress `body` with the given encoding. `static` uses the slower,
+    denser brotli setting for bodies that are compressed once and reused.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_STATIC_QUALITY if static else BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9 if static else GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compress_variants(body: bytes, minimum_size: int = COMPRESSION_MIN_SIZE) -> dict:
+    """
+    Precompute every supported encoding of a body that is served many times.
+    Returns {} for bodies under the size threshold.
+    """
+    if len(body) < minimum_size:
+        return {}
+    return {encoding: compress(body, encoding, static=True) for encoding in available_encodings()}
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    content_type = content_type.lower()
+    if content_type.startswith(INCOMPRESSIBLE_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def add_vary(headers: MutableHeaders):
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware that gzip/brotli-compresses complete responses.
+
+    Only single-chunk bodies of a compressible type and at least
+    `minimum_size` bytes are compressed. Streaming responses (chat NDJSON)
+    pass through untouched so their chunks are not held back. Responses
+    that already carry a Content-Encoding (the precompressed catalog) are
+    left alone.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        pending_start = None
+
+        async def send_wrapper(message):
+            nonlocal pending_start
+
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk shows the size
+                pending_start = message
+                return
+
+            if pending_start is None:
+                await send(message)
+                return
+
+            start, pending_start = pending_start, None
+            headers = MutableHeaders(scope=start)
+            body = message.get("body", b"")
+
+            if not is_compressible(headers.get("content-type")) or "content-encoding" in headers:
+                await send(start)
+                await send(message)
+                return
+
+            add_vary(headers)
+            if encoding is None or message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
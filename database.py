@@ -1,13 +1,61 @@
+import logging
 import os
+from typing import Optional
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from fastapi import HTTPException, Request, status
+from repository import SupabaseRepository
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger("tripolingo.database")
+
 # Get Supabase credentials from environment variables
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-# Create and export the Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Connection pool settings for the shared PostgREST client
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+
+
+def create_repository() -> Optional[SupabaseRepository]:
+    """
+    Build the app-scoped repository and its pooled HTTP client.
+
+    Called once from the FastAPI lifespan handler in app.py.
+
+    Returns:
+        The repository, or None when Supabase credentials are missing
+    """
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        logger.warning("SUPABASE_URL / SUPABASE_KEY not set - database routes will return 503")
+        return None
+
+    return SupabaseRepository(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        max_connections=SUPABASE_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+        keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        timeout=SUPABASE_TIMEOUT,
+        connect_timeout=SUPABASE_CONNECT_TIMEOUT,
+    )
+
+
+def get_repository(request: Request) -> SupabaseRepository:
+    """
+    FastAPI dependency returning the shared repository.
+    """
+    repository = getattr(request.app.state, "repository", None)
+
+    if repository is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is not configured"
+        )
+
+    return repository
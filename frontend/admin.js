@@ -261,7 +261,7 @@ async function deleteUser(userId) {
         if (!res.ok) {
             const errorData = await res.json().catch(() => ({ error: "Unknown error" }));
             console.error("Delete failed:", errorData);
-            alert(`Failed to delete user: ${errorData.error || res.statusText}`);
+            alert(`Failed to delete user: ${errorData.detail || errorData.error || res.statusText}`);
             return;
         }
 
@@ -0,0 +1,100 @@
+import hashlib
+import orjson
+from fastapi import Request, Response
+
+
+def etag_for(body: bytes) -> str:
+    """
+    Build a weak ETag from an already serialized response body.
+    """
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def compute_etag(payload) -> str:
+    """
+    Build a weak ETag from the JSON content of a response.
+
+    Args:
+        payload: JSON-serializable response body
+
+    Returns:
+        ETag header value, e.g. W/"3f2a..."
+    """
+    return etag_for(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS))
+
+
+def json_array(items) -> bytes:
+    """
+    Join already serialized JSON values into one JSON array.
+    """
+    return b"[" + b",".join(items) + b"]"
+
+
+def derive_etag(base: str, *parts) -> str:
+    """
+    Derive an ETag for a view of already-tagged content (e.g. one filtered
+    page of the catalog) without re-hashing the content itself.
+    """
+    key = "|".join([base, *(str(part) for part in parts)])
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check whether the client's If-None-Match header already names this version.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    # Weak comparison: ignore the W/ prefix on both sides
+    target = etag.removeprefix("W/")
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == target:
+            return True
+
+    return False
+
+
+def conditional_response(
+    request: Request, payload, cache_control: str, etag: str = None, content_encoding: str = None
+) -> Response:
+    """
+    Return 304 Not Modified when the client has the current version,
+    otherwise the JSON payload. Both carry ETag, Cache-Control and
+    Vary: Accept-Encoding headers.
+
+    Payloads are PostgREST rows (plain JSON types), so they are encoded
+    with orjson directly instead of going through jsonable_encoder.
+
+    Args:
+        request: Incoming request (for If-None-Match)
+        payload: JSON-serializable response body, or bytes already serialized
+        cache_control: Cache-Control header value
+        etag: Precomputed ETag; computed from the body when omitted
+        content_encoding: Set when `payload` is already compressed bytes
+
+    Returns:
+        Response with status 304 or 200
+    """
+    body = payload if isinstance(payload, bytes) else None
+    if etag is None:
+        if body is None:
+            body = orjson.dumps(payload)
+        etag = etag_for(body)
+    # The 200 may be compressed (here or by CompressionMiddleware), so the
+    # 304 must vary on Accept-Encoding too
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    # With a precomputed ETag a 304 never serializes the payload
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if body is None:
+        body = orjson.dumps(payload)
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type="application/json", headers=headers)
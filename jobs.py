@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Optional
+from fastapi import HTTPException, Request, status
+
+logger = logging.getLogger("tripolingo.jobs")
+
+# Jobs that may wait in the queue before submit() starts rejecting
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+
+# Worker tasks draining the queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Attempts per job before it is moved to the dead-letter list
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Base delay between retries in seconds (doubles each attempt)
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "0.5"))
+
+# Finished jobs remembered for status lookups
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "5000"))
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity (backpressure)."""
+
+
+class Job:
+    def __init__(self, name: str, func: Callable[[], Awaitable], max_attempts: int):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.attempts = 0
+        self.status = "pending"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    In-process asyncio queue for side-effect writes that should not sit on
+    the user-visible request path (e.g. trips auto-created by the chat).
+
+    - bounded: `submit()` raises `QueueFull` instead of growing forever
+    - retries with exponential backoff, then moves the job to a dead-letter list.
+      A failed attempt may still have written (e.g. a timeout after the
+      commit), so jobs must be idempotent
+    - `drain()` finishes queued jobs on shutdown before stopping the workers
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_size: int = JOB_QUEUE_SIZE,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_delay: float = JOB_RETRY_DELAY,
+        history_size: int = JOB_HISTORY_SIZE,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.history_size = history_size
+        self._queue = asyncio.Queue(maxsize=max_size)
+        self._tasks = []
+        self._jobs = OrderedDict()
+        self.dead_letters = deque(maxlen=100)
+
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+
+    def start(self):
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"job-worker-{index}"))
+
+    def submit(self, name: str, func: Callable[[], Awaitable]) -> Job:
+        """
+        Queue `func()` to run in the background.
+
+        Returns:
+            The pending Job (its id can be looked up with `get`)
+        """
+        job = Job(name, func, self.max_attempts)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull(f"Job queue is full ({self._queue.maxsize} jobs)")
+
+        self.submitted += 1
+        self._remember(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _remember(self, job: Job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.history_size:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            # Never forget a job that is still pending or running
+            if oldest.status in ("pending", "running"):
+                break
+            self._jobs.pop(oldest_id)
+
+    async def _run(self, job: Job):
+        while True:
+            job.attempts += 1
+            job.status = "running"
+            try:
+                job.result = await job.func()
+                job.status = "succeeded"
+                self.succeeded += 1
+                break
+            except Exception as error:
+                job.error = str(error)
+                if job.attempts >= job.max_attempts:
+                    job.status = "dead"
+                    self.failed += 1
+                    self.dead_letters.append(job.to_dict())
+                    logger.error(
+                        "Job %s %s failed after %d attempts", job.name, job.id, job.attempts,
+                        extra={"event": "job_dead", "error": str(error)},
+                    )
+                    break
+                self.retried += 1
+                job.status = "pending"
+                await asyncio.sleep(self.retry_delay * (2 ** (job.attempts - 1)))
+
+        job.finished_at = time.time()
+        job.func = None
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def drain(self, timeout: float = 10.0):
+        """
+        Wait for queued jobs to finish, then stop the workers.
+        """
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Job queue drain timed out with %d jobs left", self._queue.qsize(), extra={"event": "job_drain_timeout"})
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "depth": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "dead_letters": len(self.dead_letters),
+        }
+
+
+def get_job_queue(request: Request) -> JobQueue:
+    """
+    FastAPI dependency returning the shared background job queue.
+    """
+    jobs = getattr(request.app.state, "jobs", None)
+
+    if jobs is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Job queue is not running"
+        )
+
+    return jobs
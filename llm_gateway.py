@@ -0,0 +1,233 @@
+import asyncio
+import os
+import time
+from metrics import Histogram, observe_span
+
+# Maximum Groq calls in flight at once
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Seconds a call may wait for a free slot before failing
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "2"))
+
+# Seconds a single Groq call may take
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+
+# Consecutive failures that open the circuit, and how long it stays open
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when the LLM call fails, times out, or the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `threshold` consecutive failures. While open every
+    call fails fast; after `reset_timeout` one trial call is let through
+    (half-open) and its result closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, reset_timeout: float = LLM_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_in_flight or self.failures >= self.threshold:
+            if self.opened_at is None:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+
+    def record_cancelled(self):
+        # A cancelled trial call proves nothing; let the next caller retry
+        self.trial_in_flight = False
+
+
+class LLMGateway:
+    """
+    Guards every call to the Groq upstream.
+
+    - a semaphore caps concurrent calls; callers wait at most `queue_timeout`
+    - each call gets a hard `timeout`
+    - a circuit breaker fails fast while Groq is down
+    - identical in-flight prompts share one upstream call (coalescing)
+
+    Any failure surfaces as `UpstreamUnavailable`, which the chat routes
+    turn into their "temporarily unavailable" reply.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT,
+        breaker: CircuitBreaker = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = {}
+
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.short_circuited = 0
+        self.coalesced = 0
+        self.active = 0
+        self.latency = Histogram()
+
+    async def _acquire(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise UpstreamUnavailable("Too many concurrent LLM calls")
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise UpstreamUnavailable("LLM circuit open")
+
+    def _record_failure(self, error: Exception):
+        self.failures += 1
+        if isinstance(error, asyncio.TimeoutError):
+            self.timeouts += 1
+        self.breaker.record_failure()
+
+    async def _call(self, factory):
+        await self._acquire()
+        try:
+            self._check_breaker()
+            self.calls += 1
+            self.active += 1
+            started_at = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(factory(), self.timeout)
+            except asyncio.CancelledError:
+                self.breaker.record_cancelled()
+                raise
+            except Exception as error:
+                self._record_failure(error)
+                raise UpstreamUnavailable(str(error) or type(error).__name__) from error
+            finally:
+                elapsed = time.perf_counter() - started_at
+                self.latency.observe(elapsed)
+                observe_span("groq", "complete", elapsed)
+                self.active -= 1
+        finally:
+            self._semaphore.release()
+
+        self.breaker.record_success()
+        return result
+
+    def _forget(self, key: str, task: asyncio.Future):
+        self._in_flight.pop(key, None)
+        # Mark the result as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    async def complete(self, key: str, factory):
+        """
+        Run `factory()` (an awaitable-returning callable) through the gateway.
+
+        Calls with the same `key` that overlap share the first caller's
+        result instead of issuing another upstream request.
+        """
+        if key is not None and key in self._in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        task = asyncio.ensure_future(self._call(factory))
+        if key is not None:
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        return await asyncio.shield(task)
+
+    async def stream(self, factory):
+        """
+        Open a streaming call through the gateway and yield its chunks.
+
+        The concurrency slot is held until the stream finishes and the
+        timeout applies to the whole stream. Streams are not coalesced.
+        """
+        await self._acquire()
+        try:
+            self._check_breaker()
+            self.calls += 1
+            self.active += 1
+            started_at = time.perf_counter()
+            deadline = time.monotonic() + self.timeout
+            try:
+                stream = await asyncio.wait_for(factory(), self.timeout)
+                iterator = stream.__aiter__()
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.record_cancelled()
+                raise
+            except Exception as error:
+                self._record_failure(error)
+                raise UpstreamUnavailable(str(error) or type(error).__name__) from error
+            finally:
+                elapsed = time.perf_counter() - started_at
+                self.latency.observe(elapsed)
+                observe_span("groq", "stream", elapsed)
+                self.active -= 1
+        finally:
+            self._semaphore.release()
+
+        self.breaker.record_success()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "short_circuited": self.short_circuited,
+            "coalesced": self.coalesced,
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "latency_seconds": self.latency.snapshot(),
+        }
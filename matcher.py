@@ -0,0 +1,190 @@
+import re
+from typing import Iterable, List, Optional
+
+
+def _trie_pattern(node: dict) -> str:
+    """
+    Turn a character trie into a regex with shared prefixes factored out,
+    e.g. {"paris", "peru"} -> "p(?:aris|eru)". Matching then walks the trie
+    once per start position instead of trying every alternative.
+    """
+    is_end = "" in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+
+    if not branches:
+        return ""
+    if len(branches) == 1 and not is_end:
+        return branches[0]
+
+    group = "(?:" + "|".join(branches) + ")"
+    # Greedy "?" tries the longer continuation first
+    return group + "?" if is_end else group
+
+
+def compile_terms(terms: Iterable[str]) -> Optional[re.Pattern]:
+    """
+    Compile terms into one case-insensitive, word-bounded regex.
+    """
+    root = {}
+    for term in terms:
+        node = root
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    if not root:
+        return None
+
+    return re.compile(r"(?<!\w)(?:" + _trie_pattern(root) + r")(?!\w)", re.IGNORECASE)
+
+
+class DestinationMatcher:
+    """
+    Finds the best destination mentioned in a chat message in one pass.
+
+    Terms are the live catalog's destination names and countries (plus any
+    seed terms). They are compiled into a single trie-shaped regex with word
+    boundaries, so multi-word names work and "Bali" never matches inside
+    "Balinese". The term table is updated incrementally from catalog diffs
+    and the regex is recompiled lazily, once, on the next match.
+
+    The best match prefers catalog destination names (the most specific
+    hit) over countries and seed terms, then the longest term, then the
+    earliest mention.
+    """
+
+    def __init__(self, seed_terms: Iterable[str] = ()):
+        # lowercase term -> {"name", "country", "id", "kind"}
+        self._terms = {}
+        # destination id -> (fingerprint, terms it contributed)
+        self._destinations = {}
+        self._pattern = None
+        self._dirty = True
+        self.version = None
+        self.compiles = 0
+
+        self._seeds = {
+            term.lower(): {"name": term, "country": "", "id": None, "kind": "seed"}
+            for term in seed_terms
+        }
+        self._terms.update(self._seeds)
+
+    def _add_terms(self, destination: dict) -> tuple:
+        added = []
+        name = (destination.get("name") or "").strip()
+        country = (destination.get("country") or "").strip()
+
+        if name:
+            self._terms[name.lower()] = {"name": name, "country": country, "id": destination.get("id"), "kind": "name"}
+            added.append(name.lower())
+
+        # Countries never override a destination name of the same spelling
+        if country:
+            key = country.lower()
+            existing = self._terms.get(key)
+            if existing is None or existing["kind"] in ("seed", "country"):
+                self._terms[key] = {"name": country, "country": country, "id": None, "kind": "country"}
+            added.append(key)
+
+        return tuple(added)
+
+    def _remove_terms(self, destination_id):
+        _, terms = self._destinations.pop(destination_id, (None, ()))
+        for term in terms:
+            self._restore_term(term)
+
+    def _restore_term(self, term: str):
+        """
+        Rebuild one term from the destinations that still use it (a name
+        before a country, as in _add_terms), falling back to the seed term.
+        """
+        country_entry = None
+        for destination_id, ((name, country), _) in self._destinations.items():
+            name = (name or "").strip()
+            country = (country or "").strip()
+            if name.lower() == term:
+                self._terms[term] = {"name": name, "country": country, "id": destination_id, "kind": "name"}
+                return
+            if country_entry is None and country.lower() == term:
+                country_entry = {"name": country, "country": country, "id": None, "kind": "country"}
+
+        if country_entry is not None:
+            self._terms[term] = country_entry
+        elif term in self._seeds:
+            self._terms[term] = self._seeds[term]
+        else:
+            self._terms.pop(term, None)
+
+    def upsert(self, destination: dict):
+        destination_id = destination.get("id")
+        fingerprint = (destination.get("name"), destination.get("country"))
+
+        current = self._destinations.get(destination_id)
+        if current is not None and current[0] == fingerprint:
+            return
+
+        self._remove_terms(destination_id)
+        self._destinations[destination_id] = (fingerprint, self._add_terms(destination))
+        self._dirty = True
+
+    def remove(self, destination_id):
+        if destination_id in self._destinations:
+            self._remove_terms(destination_id)
+            self._dirty = True
+
+    def sync(self, destinations: List[dict], version: str):
+        """
+        Apply the difference between the matcher and a catalog snapshot.
+        """
+        if version == self.version:
+            return
+
+        seen = set()
+        for destination in destinations:
+            seen.add(destination.get("id"))
+            self.upsert(destination)
+
+        for destination_id in list(self._destinations):
+            if destination_id not in seen:
+                self.remove(destination_id)
+
+        self.version = version
+
+    def best_match(self, message: str) -> Optional[dict]:
+        """
+        Return the best destination mentioned in `message`, or None.
+        """
+        if self._dirty:
+            self._pattern = compile_terms(self._terms)
+            self._dirty = False
+            self.compiles += 1
+
+        if self._pattern is None:
+            return None
+
+        best = None
+        best_rank = None
+        for match in self._pattern.finditer(message):
+            entry = self._terms.get(match.group(0).lower())
+            if entry is None:
+                continue
+            rank = (entry["kind"] == "name", len(match.group(0)))
+            if best_rank is None or rank > best_rank:
+                best, best_rank = entry, rank
+
+        return best
+
+    def stats(self) -> dict:
+        return {
+            "terms": len(self._terms),
+            "destinations": len(self._destinations),
+            "compiles": self.compiles,
+        }
+
+
+def compile_keywords(keywords: Iterable[str]) -> re.Pattern:
+    """
+    Compile substring keywords (e.g. trip intents) into one regex.
+    """
+    ordered = sorted(keywords, key=len, reverse=True)
+    return re.compile("|".join(re.escape(keyword) for keyword in ordered), re.IGNORECASE)
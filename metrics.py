@@ -0,0 +1,351 @@
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+# Default latency buckets in seconds (upper bounds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram.
+
+    Observations are O(log buckets) and memory is constant, so it can stay
+    on in production. Safe to observe from worker threads.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+
+        if not total:
+            return 0.0
+
+        rank = q * total
+        running = 0
+        for index, count in enumerate(counts):
+            running += count
+            if running >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def collect(self):
+        """
+        Return (cumulative bucket counts, sum, count) from one consistent read.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            total_sum = self._sum
+
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative.append((bound, running))
+
+        return cumulative, total_sum, total
+
+    def snapshot(self) -> dict:
+        cumulative, total_sum, total = self.collect()
+
+        return {
+            "count": total,
+            "sum": round(total_sum, 6),
+            "avg": round(total_sum / total, 6) if total else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative,
+        }
+
+
+# ===============================
+# 📈 REQUEST METRICS
+# ===============================
+# One JSON line per request on the "tripolingo.access" logger ("0" disables)
+ACCESS_LOG = os.getenv("ACCESS_LOG", "1") != "0"
+
+# Sub-span totals of the request being handled: {kind: [count, seconds]}
+_request_spans: ContextVar[Optional[dict]] = ContextVar("request_spans", default=None)
+
+access_logger = logging.getLogger("tripolingo.access")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics rendered in the Prometheus text format.
+
+    - per-route request latency histograms and per-status request counts
+    - requests in flight
+    - sub-span latency histograms (Supabase queries, bcrypt, Groq calls)
+    - gauges read from callbacks at scrape time (queue depths etc.)
+
+    Routes are labelled by their template ("/trips/{user_id}"), never the
+    raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._request_latency = {}
+        self._request_counts = {}
+        self._span_latency = {}
+        self._gauges = {}
+
+    def _histogram(self, table: dict, key: tuple) -> Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        self._histogram(self._request_latency, (method, route)).observe(seconds)
+        key = (method, route, str(status))
+        with self._lock:
+            self._request_counts[key] = self._request_counts.get(key, 0) + 1
+
+    def observe_span(self, kind: str, name: str, seconds: float):
+        self._histogram(self._span_latency, (kind, name)).observe(seconds)
+
+        spans = _request_spans.get()
+        if spans is not None:
+            totals = spans.setdefault(kind, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        """
+        Register (or replace) a gauge whose value is read at scrape time.
+        """
+        self._gauges[name] = (help_text, read)
+
+    def _render_histograms(self, lines: list, name: str, help_text: str, label_names: tuple, table: dict):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, histogram in sorted(table.items()):
+            cumulative, total_sum, total = histogram.collect()
+            for bound, count in cumulative:
+                bucket_labels = _labels(label_names, key, 'le="%s"' % bound)
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+            inf_labels = _labels(label_names, key, 'le="+Inf"')
+            lines.append(f"{name}_bucket{inf_labels} {total}")
+            lines.append(f"{name}_sum{_labels(label_names, key)} {total_sum}")
+            lines.append(f"{name}_count{_labels(label_names, key)} {total}")
+
+    def render(self) -> str:
+        lines = []
+
+        self._render_histograms(
+            lines, "http_request_duration_seconds", "Request latency by route.",
+            ("method", "route"), dict(self._request_latency)
+        )
+
+        lines.append("# HELP http_requests_total Requests by route and status code.")
+        lines.append("# TYPE http_requests_total counter")
+        with self._lock:
+            counts = sorted(self._request_counts.items())
+        for key, count in counts:
+            lines.append(f"http_requests_total{_labels(('method', 'route', 'status'), key)} {count}")
+
+        lines.append("# HELP http_requests_in_flight Requests currently being handled.")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+
+        self._render_histograms(
+            lines, "span_duration_seconds", "Latency of Supabase queries, bcrypt and Groq calls.",
+            ("kind", "name"), dict(self._span_latency)
+        )
+
+        for name, (help_text, read) in sorted(self._gauges.items()):
+            try:
+                value = float(read())
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+def observe_span(kind: str, name: str, seconds: float):
+    metrics_registry.observe_span(kind, name, seconds)
+
+
+@contextmanager
+def span(kind: str, name: str):
+    """
+    Time a block as a sub-span of the current request.
+    """
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics_registry.observe_span(kind, name, time.perf_counter() - started_at)
+
+
+def configure_access_log():
+    """
+    Send access log records to stderr as bare JSON lines.
+    """
+    access_logger.propagate = False
+    if not ACCESS_LOG:
+        # Don't inherit INFO from the "tripolingo" logger (configure_app_log)
+        access_logger.setLevel(logging.WARNING)
+        return
+    if access_logger.handlers:
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    access_logger.addHandler(handler)
+    access_logger.setLevel(logging.INFO)
+
+
+# Operational logs (admin audit lines, background failures) go under "tripolingo.*"
+APP_LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+app_logger = logging.getLogger("tripolingo")
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonLogFormatter(logging.Formatter):
+    """
+    One JSON object per record, with the access log's "ts" and "event"
+    fields. `extra={...}` keys are added as fields ("event" defaults to
+    "log"); exceptions are rendered under "exc".
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "event": getattr(record, "event", "log"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != "event":
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_app_log():
+    """
+    Send "tripolingo.*" records (except the access log, which has its own
+    handler) to stderr as JSON lines, so INFO lines such as the admin
+    delete audit trail are not dropped by the root logger's WARNING default.
+    """
+    if app_logger.handlers:
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonLogFormatter())
+    app_logger.addHandler(handler)
+    app_logger.setLevel(APP_LOG_LEVEL)
+    app_logger.propagate = False
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task/stream overhead) that
+    times every HTTP request, counts status codes, tracks requests in
+    flight and writes one structured access log line.
+
+    Streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics_registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        spans = {}
+        token = _request_spans.set(spans)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.registry.in_flight += 1
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started_at
+            self.registry.in_flight -= 1
+            _request_spans.reset(token)
+
+            # FastAPI puts the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            self.registry.observe_request(method, route_path, status_code, duration)
+
+            if access_logger.isEnabledFor(logging.INFO):
+                access_logger.info(json.dumps({
+                    "ts": round(time.time(), 3),
+                    "event": "request",
+                    "method": method,
+                    "route": route_path,
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(duration * 1000, 3),
+                    "spans": {
+                        kind: {"count": count, "ms": round(seconds * 1000, 3)}
+                        for kind, (count, seconds) in spans.items()
+                    },
+                }))
@@ -1,7 +1,22 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
+from metrics import Histogram, span
+
+# bcrypt cost factor (each +1 doubles hashing time)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Threads dedicated to bcrypt; size this to the cores you can spare
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Password jobs allowed to wait for a worker before new ones are rejected
+PASSWORD_QUEUE_SIZE = int(os.getenv("PASSWORD_QUEUE_SIZE", "64"))
 
 # Configure bcrypt for password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 
 def hash_password(password: str) -> str:
@@ -29,3 +44,93 @@ def verify_password(password: str, hashed: str) -> bool:
         True if password matches, False otherwise
     """
     return pwd_context.verify(password, hashed)
+
+
+class PasswordQueueFull(Exception):
+    """Raised when too many password jobs are already waiting."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated, size-limited thread pool.
+
+    bcrypt releases the GIL, so hashing on these threads keeps the event
+    loop free while using real cores. At most `workers` hashes run at once
+    and at most `queue_size` more may wait; beyond that `PasswordQueueFull`
+    is raised so a login burst cannot build an unbounded backlog.
+    """
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_size: int = PASSWORD_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+        self.pending = 0
+        self.running = 0
+        self.rejected = 0
+        self.hash_latency = Histogram()
+        self.verify_latency = Histogram()
+        self.wait_latency = Histogram()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _timed(self, func, histogram: Histogram, submitted_at: float, *args):
+        started_at = time.perf_counter()
+        self.wait_latency.observe(started_at - submitted_at)
+        with self._lock:
+            self.running += 1
+        try:
+            return func(*args)
+        finally:
+            histogram.observe(time.perf_counter() - started_at)
+            with self._lock:
+                self.running -= 1
+
+    async def _submit(self, func, histogram: Histogram, *args):
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise PasswordQueueFull("Too many password requests in progress")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(),
+                self._timed, func, histogram, time.perf_counter(), *args
+            )
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        with span("bcrypt", "hash"):
+            return await self._submit(hash_password, self.hash_latency, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        with span("bcrypt", "verify"):
+            return await self._submit(verify_password, self.verify_latency, password, hashed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "running": self.running,
+            "queue_depth": max(self.pending - self.running, 0),
+            "rejected": self.rejected,
+            "wait_seconds": self.wait_latency.snapshot(),
+            "hash_seconds": self.hash_latency.snapshot(),
+            "verify_seconds": self.verify_latency.snapshot(),
+        }
+
+
+# Shared pool used by the auth routes
+password_hasher = PasswordHasher()
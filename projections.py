@@ -0,0 +1,95 @@
+from typing import Iterable, List
+from tokens import PREFERENCE_CLAIMS
+
+
+class UnprojectedColumn(KeyError):
+    """Raised when a handler reads a column its query did not select."""
+
+
+class ProjectedRow(dict):
+    """
+    A row returned for a Projection.
+
+    Reading a column outside the projection raises UnprojectedColumn
+    instead of quietly returning a default, so a handler that starts using
+    a new field fails loudly until the column is added to its projection.
+    """
+
+    __slots__ = ("columns",)
+
+    def __init__(self, row: dict, columns: frozenset):
+        super().__init__(row)
+        self.columns = columns
+
+    def _check(self, key):
+        if key not in self.columns:
+            raise UnprojectedColumn(f"Column {key!r} is not in this query's projection")
+
+    def __getitem__(self, key):
+        self._check(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._check(key)
+        return super().get(key, default)
+
+
+class Projection:
+    """
+    The columns one query selects from one table.
+    """
+
+    def __init__(self, table: str, *columns: str):
+        self.table = table
+        self.columns = tuple(dict.fromkeys(columns))
+        self._column_set = frozenset(self.columns)
+
+    @property
+    def select(self) -> str:
+        return ",".join(self.columns)
+
+    def rows(self, rows: Iterable[dict]) -> List[ProjectedRow]:
+        return [ProjectedRow(row, self._column_set) for row in rows]
+
+    def __repr__(self) -> str:
+        return f"Projection({self.table!r}, {self.select!r})"
+
+
+# 🗂️ Columns each endpoint reads, by "<module>.<handler>"
+# Add a column here before a handler (or its response model) uses it.
+PROJECTIONS = {
+    # Auth
+    "auth.signup": Projection("users", "id", "username", "email"),
+    "auth.signin": Projection("users", "id", "username", "email", "display_name", "password_hash", *PREFERENCE_CLAIMS),
+    "auth.refresh": Projection("users", "id", "username", *PREFERENCE_CLAIMS),
+    "auth.profile": Projection(
+        "users", "id", "username", "email", "display_name", "created_at", *PREFERENCE_CLAIMS
+    ),
+    "auth.preferences": Projection("users", "id", "username", *PREFERENCE_CLAIMS),
+
+    # Chat context and recommendation ranking
+    "ai_chat.context": Projection("users", *PREFERENCE_CLAIMS),
+    "ranking.preferences": Projection("users", *PREFERENCE_CLAIMS),
+
+    # Destinations catalog
+    "recommendations.catalog": Projection(
+        "destinations", "id", "name", "country", "description", "activities",
+        "travel_style", "budget", "activity_tags"
+    ),
+
+    # Admin
+    "admin.users": Projection("users", "id", "username", "email", "display_name", "created_at"),
+    "admin.destinations": Projection(
+        "destinations", "id", "name", "country", "description", "activities",
+        "travel_style", "budget", "active"
+    ),
+    "admin.destination_toggle": Projection("destinations", "id", "active"),
+
+    # Trips
+    "trips.reconcile": Projection("trips", "id", "status", "start_date", "end_date", "trip_date"),
+    "trips.reconcile_watermark": Projection("scheduler_state", "last_run"),
+}
+
+
+def projection(name: str) -> Projection:
+    return PROJECTIONS[name]
@@ -0,0 +1,12 @@
+from typing import List, Optional
+
+
+def split_values(values: Optional[List[str]]) -> List[str]:
+    """
+    Accept both repeated (?activities=a&activities=b) and comma-separated
+    (?activities=a,b) query parameters.
+    """
+    result = []
+    for value in values or []:
+        result.extend(part.strip() for part in value.split(",") if part.strip())
+    return result
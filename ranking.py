@@ -0,0 +1,158 @@
+import os
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Request, status
+from catalog_index import DestinationIndex
+from projections import projection
+from repository import RepositoryError, SupabaseRepository
+
+# How long a user's stored preferences are trusted before re-reading them
+PREFERENCE_CACHE_TTL = float(os.getenv("PREFERENCE_CACHE_TTL", "300"))
+
+# Maximum number of users kept in the per-user ranking cache
+PREFERENCE_CACHE_SIZE = int(os.getenv("PREFERENCE_CACHE_SIZE", "10000"))
+
+# Budget slider positions used by discover.js / profile.js. The middle
+# position ("2") is the slider's resting value and means "no budget
+# filter" in applyFilters, so it maps to None.
+SLIDER_BUDGETS = {"1": "low", "2": None, "3": "high", "4": "premium"}
+
+Preferences = Tuple[Optional[str], Tuple[str, ...], Tuple[str, ...]]
+
+
+def normalize_budget(value) -> Optional[str]:
+    """
+    Map a stored budget (slider position or category name) to the
+    lowercase category used in the destinations table, or None when it
+    should not be scored.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    return SLIDER_BUDGETS.get(value, value.lower())
+
+
+def preferences_from_user(user: Optional[dict]) -> Optional[Preferences]:
+    """
+    Extract (budget, activities, regions) from a users row.
+
+    Returns:
+        The preferences, or None when the user has not set any
+    """
+    if not user:
+        return None
+
+    budget = normalize_budget(user.get("preferred_budget"))
+    activities = tuple(user.get("preferred_activities") or ())
+    regions = tuple(user.get("preferred_regions") or ())
+
+    if not (budget or activities or regions):
+        return None
+    return budget, activities, regions
+
+
+class RecommendationEngine:
+    """
+    Ranks the destinations catalog against each user's stored preferences.
+
+    Scoring uses the catalog's DestinationIndex bitsets, so one user's
+    ranking over the whole catalog is a few bitwise operations. Each user's
+    preferences and resulting score buckets are kept in an LRU cache,
+    keyed by the catalog ETag so catalog changes re-score automatically.
+    Call `invalidate(user_id)` when a user's preferences change.
+    """
+
+    def __init__(
+        self,
+        repository: SupabaseRepository,
+        ttl: float = PREFERENCE_CACHE_TTL,
+        max_users: int = PREFERENCE_CACHE_SIZE,
+    ):
+        self._repository = repository
+        self.ttl = ttl
+        self.max_users = max_users
+        # user_id -> (expires_at, preferences, catalog_etag, score_masks)
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def _load_preferences(self, user_id: str) -> Optional[Preferences]:
+        try:
+            user = await self._repository.get_user_by_id(user_id, projection("ranking.preferences"))
+        except RepositoryError:
+            # Guest or malformed IDs simply get the unpersonalized catalog
+            return None
+        return preferences_from_user(user)
+
+    async def score_masks(
+        self,
+        user_id: str,
+        index: DestinationIndex,
+        catalog_etag: str,
+    ) -> Tuple[Optional[Preferences], Optional[List[Tuple[int, int]]]]:
+        """
+        Return the user's preferences and their score buckets over `index`.
+
+        Returns:
+            (preferences, masks), or (None, None) when the user has no preferences
+        """
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+
+        if entry is not None and entry[0] > now:
+            _, preferences, etag, masks = entry
+            self._entries.move_to_end(user_id)
+            if etag == catalog_etag:
+                self.hits += 1
+                return preferences, masks
+        else:
+            preferences = await self._load_preferences(user_id)
+        self.misses += 1
+
+        masks = index.score_masks(*preferences) if preferences else None
+        expires_at = entry[0] if entry is not None and entry[0] > now else now + self.ttl
+        self._entries[user_id] = (expires_at, preferences, catalog_etag, masks)
+        self._entries.move_to_end(user_id)
+
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+        return preferences, masks
+
+    def invalidate(self, user_id: str):
+        """
+        Forget a user's cached preferences and ranking.
+        """
+        if self._entries.pop(str(user_id), None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "users": len(self._entries),
+            "ttl_seconds": self.ttl,
+        }
+
+
+def get_recommender(request: Request) -> RecommendationEngine:
+    """
+    FastAPI dependency returning the shared recommendation engine.
+    """
+    recommender = getattr(request.app.state, "recommender", None)
+
+    if recommender is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is not configured"
+        )
+
+    return recommender
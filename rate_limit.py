@@ -0,0 +1,206 @@
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
+from tokens import get_token_claims
+
+# Set to "0" to turn every limit off (e.g. for load tests)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+
+# Most keys tracked per policy; the least recently seen are dropped beyond this
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Behind a proxy, the client IP is the first X-Forwarded-For entry
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"
+
+# Per-route limits as "requests/seconds" (the bucket holds `requests`
+# tokens and refills over `seconds`); empty or "0" disables one. "user"
+# buckets only apply to requests with a verified access token.
+RATE_LIMIT_POLICIES = {
+    # Every chat message is a Groq call
+    "ai_chat": {
+        "user": os.getenv("RATE_LIMIT_CHAT_USER", "20/60"),
+        "ip": os.getenv("RATE_LIMIT_CHAT_IP", "60/60"),
+    },
+    # Every signin is a bcrypt verify
+    "auth.signin": {
+        "ip": os.getenv("RATE_LIMIT_SIGNIN_IP", "10/60"),
+    },
+    "auth.signup": {
+        "ip": os.getenv("RATE_LIMIT_SIGNUP_IP", "5/600"),
+    },
+}
+
+
+def parse_limit(spec: Optional[str]) -> Optional[tuple]:
+    """
+    Parse "requests/seconds" into (capacity, period). Returns None when
+    the limit is disabled.
+    """
+    if not spec or spec.strip() == "0":
+        return None
+
+    requests, _, seconds = spec.partition("/")
+    capacity, period = int(requests), float(seconds or "1")
+    if capacity <= 0 or period <= 0:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    return capacity, period
+
+
+class TokenBuckets:
+    """
+    Token buckets for one policy, keyed by user ID or client IP.
+
+    Each key costs one (tokens, updated_at) entry; tokens are refilled
+    lazily from the elapsed time, so there is no timer per key. Keys are
+    kept in least-recently-seen order: a bucket untouched for a full
+    refill period is indistinguishable from a new one, so it is dropped
+    from the front, and `max_keys` caps memory under high cardinality.
+    """
+
+    def __init__(self, capacity: int, period: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        # key -> (tokens, updated_at)
+        self._buckets = OrderedDict()
+
+        self.allowed = 0
+        self.limited = 0
+        self.evictions = 0
+
+    def _evict_idle(self, now: float):
+        while self._buckets:
+            key, (_, updated_at) = next(iter(self._buckets.items()))
+            # Oldest first: the first bucket still refilling ends the sweep
+            if now - updated_at < self.period:
+                break
+            del self._buckets[key]
+            self.evictions += 1
+
+    def take(self, key: str, now: float = None) -> float:
+        """
+        Spend one token for `key`.
+
+        Returns:
+            0 when allowed, otherwise seconds until a token is available
+        """
+        now = time.monotonic() if now is None else now
+        self._evict_idle(now)
+
+        entry = self._buckets.pop(key, None)
+        if entry is None:
+            tokens = float(self.capacity)
+        else:
+            tokens = min(self.capacity, entry[0] + (now - entry[1]) * self.rate)
+
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+            self.allowed += 1
+        else:
+            wait = (1 - tokens) / self.rate
+            self.limited += 1
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "limit": f"{self.capacity}/{self.period:g}s",
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "evictions": self.evictions,
+        }
+
+
+class RateLimiter:
+    """
+    Per-route token bucket limits by user ID and client IP.
+
+    A request must get a token from every bucket that applies to it. The
+    IP bucket is checked first so a client hammering one address does not
+    also drain the user's own allowance.
+    """
+
+    SCOPES = ("ip", "user")
+
+    def __init__(self, policies: dict = RATE_LIMIT_POLICIES, enabled: bool = RATE_LIMIT_ENABLED):
+        self.enabled = enabled
+        self.policies = {}
+        for route, limits in policies.items():
+            for scope, spec in limits.items():
+                if scope not in self.SCOPES:
+                    raise ValueError(f"Unknown rate limit scope: {scope}")
+                limit = parse_limit(spec)
+                if limit is not None:
+                    self.policies[(route, scope)] = TokenBuckets(*limit)
+
+    def check(self, route: str, ip: Optional[str] = None, user_id: Optional[str] = None) -> float:
+        """
+        Returns:
+            0 when the request may proceed, otherwise the Retry-After in seconds
+        """
+        if not self.enabled:
+            return 0.0
+
+        for scope, key in (("ip", ip), ("user", user_id)):
+            buckets = self.policies.get((route, scope))
+            if buckets is None or key is None:
+                continue
+            wait = buckets.take(str(key))
+            if wait:
+                return wait
+
+        return 0.0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "policies": {f"{route}:{scope}": buckets.stats() for (route, scope), buckets in self.policies.items()},
+        }
+
+
+rate_limiter = RateLimiter()
+
+
+def client_ip(request: Request) -> Optional[str]:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+def rate_limit(route: str):
+    """
+    FastAPI dependency factory enforcing the `route` policy.
+
+    The user key is the verified token subject, never the path ID: path
+    IDs are unauthenticated (anyone could drain another user's bucket) and
+    signed-out clients all send the same placeholder ("null"). Requests
+    without a token are limited by IP only.
+
+    Raises 429 with a Retry-After header when a bucket is empty.
+    """
+    async def dependency(request: Request, claims: Optional[dict] = Depends(get_token_claims)):
+        user_id = claims["sub"] if claims is not None else None
+        wait = rate_limiter.check(route, ip=client_ip(request), user_id=user_id)
+
+        if wait:
+            retry_after = max(1, math.ceil(wait))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many requests, try again in {retry_after} seconds",
+                headers={"Retry-After": str(retry_after)}
+            )
+
+    return dependency
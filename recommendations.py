@@ -1,30 +1,40 @@
-from fastapi import APIRouter, HTTPException
+import base64
+import json
+from typing import List, Optional, Union
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from dotenv import load_dotenv
-from database import supabase
+from cache import CATALOG_MAX_AGE, CatalogCache, get_catalog_cache
+from catalog_index import DestinationIndex
+from compression import negotiate_encoding
+from http_cache import conditional_response, derive_etag, json_array
+from projections import projection
+from query_params import split_values
+from ranking import RecommendationEngine, get_recommender, normalize_budget, preferences_from_user
+from repository import SupabaseRepository
+from schemas import DestinationResponse, RecommendationPage
+from tokens import authorize_user, get_token_claims
 
 load_dotenv()
 
 router = APIRouter()
 
-@router.get("/recommendations/{user_id}")
-async def get_recommendations(user_id: str):
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+async def load_catalog(repository: SupabaseRepository) -> list:
     """
-    Fetch all active destinations without personalization.
-    User preferences/onboarding removed - filtering done via UI only.
+    Fetch ALL active destinations and shape them for the catalog cache.
     """
-    
-    # Fetch ALL active destinations from database
-    destinations_result = supabase.table("destinations") \
-        .select("*") \
-        .eq("active", True) \
-        .execute()
-    
-    if not destinations_result.data:
+    destinations_result = await repository.list_active_destinations(projection("recommendations.catalog"))
+
+    if not destinations_result:
         return []
-    
+
     destinations = []
 
-    for destination in destinations_result.data:
+    for destination in destinations_result:
         # Build response with required fields
         destinations.append({
             "id": destination["id"],
@@ -38,3 +48,112 @@ async def get_recommendations(user_id: str):
         })
 
     return destinations
+
+
+def encode_cursor(offset: int, etag: str) -> str:
+    raw = json.dumps({"o": offset, "v": etag}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str, etag: str) -> int:
+    """
+    Turn a cursor back into an offset. Cursors are tied to the catalog
+    version they were issued for, so pages never skip or repeat items.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        offset = int(data["o"])
+        version = data["v"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if version != etag or offset < 0:
+        raise HTTPException(status_code=400, detail="Cursor expired, reload the first page")
+
+    return offset
+
+
+def ranked_items(rows: List[bytes], ranked: list, scored: bool) -> bytes:
+    """
+    Build the JSON array for one ranked page from the cached, already
+    serialized catalog rows. With `scored`, "match_score" is spliced in
+    as the last key of each object instead of copying and re-encoding it.
+    """
+    if not scored:
+        return json_array(rows[position] for position, _ in ranked)
+    return json_array(rows[position][:-1] + b',"match_score":%d}' % score for position, score in ranked)
+
+
+@router.get(
+    "/recommendations/{user_id}",
+    response_model=Union[List[DestinationResponse], RecommendationPage],
+)
+async def get_recommendations(
+    user_id: str,
+    request: Request,
+    budget: Optional[str] = None,
+    activities: Optional[List[str]] = Query(None),
+    regions: Optional[List[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    catalog: CatalogCache = Depends(get_catalog_cache),
+    recommender: RecommendationEngine = Depends(get_recommender),
+    claims: Optional[dict] = Depends(get_token_claims),
+):
+    """
+    Fetch active destinations, served from the in-process catalog cache.
+
+    Destinations are ranked against the user's stored preferences
+    (preferred_budget / preferred_activities / preferred_regions). Explicit
+    `budget`, `activities` and `regions` override them. Scoring matches
+    discover.js and best matches come first; users without preferences get
+    catalog order. With a bearer token the preferences come from the token
+    instead of the database. `limit` / `cursor` switch the response to one
+    page: {"items", "next_cursor", "total"}.
+
+    Returns 304 when the client's If-None-Match matches the current ETag.
+    """
+    authorize_user(claims, user_id)
+
+    destinations = await catalog.get()
+    index = catalog.index
+    rows = catalog.rows
+    catalog_etag = catalog.etag
+
+    budget = normalize_budget(budget)
+    activities = split_values(activities)
+    regions = split_values(regions)
+    paged = limit is not None or cursor is not None
+    cache_control = f"private, max-age={CATALOG_MAX_AGE}"
+
+    if budget or activities or regions:
+        criteria = (budget, tuple(activities), tuple(regions))
+        masks = index.score_masks(*criteria)
+    elif claims is not None:
+        criteria = preferences_from_user(claims.get("prefs"))
+        masks = index.score_masks(*criteria) if criteria else None
+    else:
+        criteria, masks = await recommender.score_masks(user_id, index, catalog_etag)
+
+    # ⚡ The whole catalog goes out as the cached (and precompressed) bytes
+    if masks is None and not paged:
+        body, content_encoding = catalog.encoded_body(negotiate_encoding(request.headers.get("accept-encoding")))
+        return conditional_response(
+            request, body, cache_control=cache_control, etag=catalog_etag, content_encoding=content_encoding
+        )
+
+    offset = decode_cursor(cursor, catalog_etag) if cursor else 0
+    page_size = (limit or DEFAULT_PAGE_SIZE) if paged else None
+
+    ranked = DestinationIndex.page(masks or [(0, index.all_mask)], offset=offset, limit=page_size)
+
+    items = ranked_items(rows, ranked, scored=masks is not None)
+    etag = derive_etag(catalog_etag, criteria, offset, page_size)
+
+    if not paged:
+        return conditional_response(request, items, cache_control=cache_control, etag=etag)
+
+    next_offset = offset + len(ranked)
+    next_cursor = encode_cursor(next_offset, catalog_etag) if next_offset < len(destinations) else None
+    payload = b'{"items":%s,"next_cursor":%s,"total":%d}' % (items, orjson.dumps(next_cursor), len(destinations))
+    return conditional_response(request, payload, cache_control=cache_control, etag=etag)
@@ -0,0 +1,531 @@
+import asyncio
+from typing import Optional, Tuple
+
+import httpx
+
+from metrics import span
+from projections import Projection
+
+
+class RepositoryError(Exception):
+    """
+    Raised when PostgREST rejects a query.
+
+    Carries the HTTP status plus the Postgres error code/details returned
+    by PostgREST so callers can map specific failures to API errors.
+    """
+
+    def __init__(self, status_code: int, message: str, code: str = None, details: str = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.details = details
+
+    @classmethod
+    def from_response(cls, response: httpx.Response) -> "RepositoryError":
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+
+        if not isinstance(body, dict):
+            body = {}
+
+        return cls(
+            status_code=response.status_code,
+            message=body.get("message") or response.text or f"HTTP {response.status_code}",
+            code=body.get("code"),
+            details=body.get("details"),
+        )
+
+
+def _value(value) -> str:
+    """
+    Format a Python value for a PostgREST filter.
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _quoted(value) -> str:
+    """
+    Double-quote a value inside an or=()/and=() group or in.() list so commas,
+    dots and parentheses in user input are taken literally.
+    """
+    escaped = _value(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _like_prefix(text: str) -> str:
+    """
+    ILIKE pattern for values starting with `text`. LIKE wildcards (%, _) and
+    the escape character are escaped so they match literally; "*", which
+    PostgREST turns into %, is dropped.
+    """
+    escaped = text.replace("*", "").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "*"
+
+
+def eq(value) -> str:
+    return f"eq.{_value(value)}"
+
+
+def in_(values) -> str:
+    # Ids come from request bodies; quoting keeps "1,2" or "1)" one literal value
+    return "in.(" + ",".join(_quoted(value) for value in values) + ")"
+
+
+class SupabaseRepository:
+    """
+    Async data access layer over the Supabase PostgREST API.
+
+    Every query the routers make has one method here. Requests go through a
+    single httpx.AsyncClient with a bounded connection pool, so a slow query
+    only holds a connection instead of blocking the event loop.
+
+    Pass a custom `client` (e.g. one built on httpx.MockTransport or pointed
+    at a local PostgREST) to run the routers without Supabase.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        client: httpx.AsyncClient = None,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+    ):
+        self.rest_url = f"{base_url.rstrip('/')}/rest/v1"
+        self.headers = {
+            "apikey": api_key,
+            "Authorization": f"Bearer {api_key}",
+        }
+        self.client = client or httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _send(self, method: str, table: str, params=None, json=None, prefer: str = None) -> httpx.Response:
+        headers = dict(self.headers)
+        if prefer:
+            headers["Prefer"] = prefer
+
+        with span("supabase", f"{method} {table}"):
+            response = await self.client.request(
+                method,
+                f"{self.rest_url}/{table}",
+                params=params,
+                json=json,
+                headers=headers,
+            )
+
+        if response.is_error:
+            raise RepositoryError.from_response(response)
+        return response
+
+    async def _request(self, method: str, table: str, params=None, json=None, prefer: str = None) -> list:
+        response = await self._send(method, table, params=params, json=json, prefer=prefer)
+
+        if not response.content:
+            return []
+        return response.json()
+
+    async def _read(self, projection: Projection, table: str, params: dict, method: str = "GET", **kwargs) -> list:
+        """
+        Run a query that selects exactly `projection`'s columns and wrap the
+        rows so reading any other column raises.
+        """
+        if projection.table != table:
+            raise ValueError(f"{projection!r} cannot be used on table {table!r}")
+
+        rows = await self._request(method, table, params={**params, "select": projection.select}, **kwargs)
+        return projection.rows(rows)
+
+    async def _search(
+        self,
+        table: str,
+        projection: Projection,
+        search_columns: tuple,
+        q: str = None,
+        sort: str = "id",
+        descending: bool = False,
+        after: tuple = None,
+        limit: int = None,
+        count: str = None,
+    ) -> Tuple[list, Optional[int]]:
+        """
+        Keyset-paged listing with an optional prefix search.
+
+        Rows are ordered by `sort` (nulls last) with id as the tie-breaker.
+        `after` is the (sort value, id) of the last row of the previous page.
+        `q` matches the start of any of `search_columns` (ILIKE 'q%'), which
+        the trigram indexes in sql/admin_search_indexes.sql serve.
+        `count` ("estimated", "planned" or "exact") asks PostgREST for a
+        total in Content-Range; "estimated" avoids a full scan on big tables.
+
+        Returns:
+            (rows, total) - total is None unless a count was requested
+        """
+        params = {"order": f"{sort}.{'desc' if descending else 'asc'}.nullslast"}
+        if sort != "id":
+            params["order"] += ",id.asc"
+
+        conditions = []
+        if q:
+            pattern = _quoted(_like_prefix(q))
+            conditions.append("or(" + ",".join(f"{column}.ilike.{pattern}" for column in search_columns) + ")")
+
+        if after is not None:
+            value, last_id = after
+            if sort == "id":
+                conditions.append(f"id.{'lt' if descending else 'gt'}.{_quoted(last_id)}")
+            elif value is None:
+                conditions.append(f"and({sort}.is.null,id.gt.{_quoted(last_id)})")
+            else:
+                conditions.append(
+                    f"or({sort}.{'lt' if descending else 'gt'}.{_quoted(value)},{sort}.is.null,"
+                    f"and({sort}.eq.{_quoted(value)},id.gt.{_quoted(last_id)}))"
+                )
+
+        if conditions:
+            params["and"] = "(" + ",".join(conditions) + ")"
+        if limit is not None:
+            params["limit"] = str(limit)
+
+        if projection.table != table:
+            raise ValueError(f"{projection!r} cannot be used on table {table!r}")
+
+        response = await self._send(
+            "GET",
+            table,
+            params={**params, "select": projection.select},
+            prefer=f"count={count}" if count else None,
+        )
+
+        total = None
+        if count:
+            # Content-Range: 0-49/1234 (or */1234 for an empty page)
+            _, _, size = response.headers.get("content-range", "").partition("/")
+            total = int(size) if size.isdigit() else None
+
+        rows = response.json() if response.content else []
+        return projection.rows(rows), total
+
+    async def _select(self, table: str, projection: Projection, **filters) -> list:
+        params = {key: eq(value) for key, value in filters.items()}
+        return await self._read(projection, table, params)
+
+    async def _insert(self, table: str, data) -> list:
+        return await self._request("POST", table, json=data, prefer="return=representation")
+
+    async def _update(self, table: str, data: dict, **filters) -> list:
+        params = {key: eq(value) for key, value in filters.items()}
+        return await self._request("PATCH", table, params=params, json=data, prefer="return=representation")
+
+    async def _delete(self, table: str, **filters) -> list:
+        params = {key: eq(value) for key, value in filters.items()}
+        return await self._request("DELETE", table, params=params, prefer="return=representation")
+
+    # ===============================
+    # 👤 USERS
+    # ===============================
+    async def get_user_by_username(self, username: str, projection: Projection) -> Optional[dict]:
+        rows = await self._select("users", projection, username=username)
+        return rows[0] if rows else None
+
+    async def get_user_by_email(self, email: str, projection: Projection) -> Optional[dict]:
+        rows = await self._select("users", projection, email=email)
+        return rows[0] if rows else None
+
+    async def find_users_by_username_or_email(self, username: str, email: str, projection: Projection) -> list:
+        """
+        Users whose username or email matches, in a single query.
+        """
+        params = {"or": f"(username.eq.{_quoted(username)},email.eq.{_quoted(email)})"}
+        return await self._read(projection, "users", params)
+
+    async def get_user_by_id(self, user_id, projection: Projection) -> Optional[dict]:
+        rows = await self._select("users", projection, id=user_id)
+        return rows[0] if rows else None
+
+    async def list_users(self, projection: Projection) -> list:
+        return await self._select("users", projection)
+
+    async def search_users(self, projection: Projection, **options) -> Tuple[list, Optional[int]]:
+        """
+        Page through users, optionally by username/email prefix (see _search).
+        """
+        return await self._search("users", projection, ("username", "email"), **options)
+
+    async def insert_user(self, user: dict) -> list:
+        return await self._insert("users", user)
+
+    async def update_user(self, user_id, data: dict, projection: Projection) -> list:
+        """
+        Update a user and return the updated row, projected.
+        """
+        return await self._read(
+            projection, "users", {"id": eq(user_id)}, method="PATCH", json=data, prefer="return=representation"
+        )
+
+    async def delete_user(self, user_id: str) -> list:
+        return await self._delete("users", id=user_id)
+
+    async def delete_user_preferences(self, user_id: str) -> list:
+        return await self._delete("user_preferences", user_id=user_id)
+
+    async def delete_users_cascade(self, user_ids: list) -> dict:
+        """
+        Delete users together with their trips and preferences.
+
+        The child tables are cleared concurrently (one request each for all
+        users), then the users themselves. If a child delete fails the users
+        are left in place, so a retry can finish the job and no orphaned
+        rows are left behind.
+
+        Args:
+            user_ids: Users to delete (trips/user_preferences.user_id is text)
+
+        Returns:
+            {"trips": n, "preferences": n, "users": [deleted user ids]}
+
+        Raises:
+            RepositoryError: If any step fails
+        """
+        if not user_ids:
+            return {"trips": 0, "preferences": 0, "users": []}
+
+        user_filter = {"user_id": in_(user_ids), "select": "user_id"}
+        trips, preferences = await asyncio.gather(
+            self._request("DELETE", "trips", params=user_filter, prefer="return=representation"),
+            self._request("DELETE", "user_preferences", params=user_filter, prefer="return=representation"),
+        )
+
+        users = await self._request(
+            "DELETE", "users", params={"id": in_(user_ids), "select": "id"}, prefer="return=representation"
+        )
+
+        return {
+            "trips": len(trips),
+            "preferences": len(preferences),
+            "users": [str(row["id"]) for row in users],
+        }
+
+    # ===============================
+    # 🌍 DESTINATIONS
+    # ===============================
+    async def list_active_destinations(self, projection: Projection) -> list:
+        return await self._select("destinations", projection, active=True)
+
+    async def list_destinations(self, projection: Projection) -> list:
+        return await self._select("destinations", projection)
+
+    async def search_destinations(self, projection: Projection, **options) -> Tuple[list, Optional[int]]:
+        """
+        Page through destinations, optionally by name/country prefix (see _search).
+        """
+        return await self._search("destinations", projection, ("name", "country"), **options)
+
+    async def get_destination(self, destination_id: str, projection: Projection) -> Optional[dict]:
+        rows = await self._select("destinations", projection, id=destination_id)
+        return rows[0] if rows else None
+
+    async def insert_destination(self, destination: dict) -> list:
+        return await self._insert("destinations", destination)
+
+    async def update_destination(self, destination_id: str, data: dict) -> list:
+        return await self._update("destinations", data, id=destination_id)
+
+    async def delete_destination(self, destination_id: str) -> list:
+        return await self._delete("destinations", id=destination_id)
+
+    # ===============================
+    # ✈️ TRIPS
+    # ===============================
+    async def list_trips(
+        self,
+        user_id: str,
+        projection: Projection,
+        statuses: list = None,
+        start_from=None,
+        start_to=None,
+        after_id=None,
+        limit: int = None,
+    ) -> list:
+        """
+        One user's trips, filtered and projected in PostgREST.
+
+        Args:
+            user_id: Owner of the trips
+            projection: Columns to return
+            statuses: Only trips with one of these statuses
+            start_from: Only trips starting on or after this date
+            start_to: Only trips starting on or before this date
+            after_id: Keyset cursor; only trips with a greater id
+            limit: Page size (rows come back ordered by id)
+
+        Returns:
+            Matching rows
+        """
+        params = {"user_id": eq(user_id)}
+
+        if statuses:
+            params["status"] = in_(statuses)
+
+        # Legacy rows only have trip_date, so it stands in for start_date
+        ranges = []
+        if start_from is not None:
+            ranges.append(f"or(start_date.gte.{start_from},and(start_date.is.null,trip_date.gte.{start_from}))")
+        if start_to is not None:
+            ranges.append(f"or(start_date.lte.{start_to},and(start_date.is.null,trip_date.lte.{start_to}))")
+        if ranges:
+            params["and"] = "(" + ",".join(ranges) + ")"
+
+        if after_id is not None:
+            params["id"] = f"gt.{_value(after_id)}"
+        if limit is not None:
+            params["order"] = "id.asc"
+            params["limit"] = str(limit)
+
+        return await self._read(projection, "trips", params)
+
+    async def insert_trip(self, trip: dict) -> list:
+        return await self._insert("trips", trip)
+
+    async def insert_trip_once(self, trip: dict, idempotency_key: str) -> list:
+        """
+        Insert a trip at most once per `idempotency_key`, so a retried
+        background insert cannot create a duplicate when the first attempt
+        committed but its response was lost (e.g. a read timeout).
+
+        Returns:
+            The inserted row, or [] if a trip with this key already exists
+        """
+        return await self._request(
+            "POST",
+            "trips",
+            params={"on_conflict": "idempotency_key"},
+            json={**trip, "idempotency_key": idempotency_key},
+            prefer="return=representation,resolution=ignore-duplicates",
+        )
+
+    async def update_trip(self, trip_id: str, data: dict) -> list:
+        return await self._update("trips", data, id=trip_id)
+
+    async def delete_trips_by_user(self, user_id: str) -> list:
+        return await self._delete("trips", user_id=user_id)
+
+    async def list_trips_crossing(self, since, until, projection: Projection, after_id=None, limit: int = 1000) -> list:
+        """
+        Dated trips whose start or end boundary was crossed in (since, until],
+        ordered by id for keyset paging. `since=None` returns every dated trip.
+
+        Args:
+            since: Date of the previous reconciliation run, or None
+            until: Date of this run
+            projection: Columns to return (at least id, status and the dates)
+            after_id: Return trips with an id greater than this
+            limit: Page size
+
+        Returns:
+            Matching rows
+        """
+        params = {
+            "status": "not.in.(wishlist,cancelled)",
+            "order": "id.asc",
+            "limit": str(limit),
+        }
+
+        if since is None:
+            params["or"] = "(start_date.not.is.null,trip_date.not.is.null)"
+        else:
+            # Starts on (since, until] become ongoing, ends on [since, until) become completed
+            params["or"] = (
+                f"(and(start_date.gt.{since},start_date.lte.{until}),"
+                f"and(end_date.gte.{since},end_date.lt.{until}),"
+                f"and(trip_date.gte.{since},trip_date.lte.{until}),"
+                # Start-only trips end on their start date: completed the day after
+                f"and(end_date.is.null,trip_date.is.null,start_date.gte.{since},start_date.lt.{until}))"
+            )
+
+        if after_id is not None:
+            params["id"] = f"gt.{_value(after_id)}"
+
+        return await self._read(projection, "trips", params)
+
+    async def get_scheduler_state(self, name: str, projection: Projection) -> Optional[dict]:
+        rows = await self._select("scheduler_state", projection, name=name)
+        return rows[0] if rows else None
+
+    async def set_scheduler_state(self, name: str, data: dict) -> list:
+        """
+        Upsert the state row of a scheduled task (sql/scheduler_state.sql).
+        """
+        return await self._request(
+            "POST",
+            "scheduler_state",
+            params={"on_conflict": "name"},
+            json={**data, "name": name},
+            prefer="return=representation,resolution=merge-duplicates",
+        )
+
+    async def set_trips_status(self, trip_ids: list, status: str, user_id: str = None) -> list:
+        """
+        Set one status on many trips in a single PATCH.
+
+        Returns:
+            The ids of the rows that were updated
+        """
+        if not trip_ids:
+            return []
+
+        params = {"id": in_(trip_ids), "select": "id"}
+        if user_id is not None:
+            params["user_id"] = eq(user_id)
+
+        return await self._request(
+            "PATCH", "trips", params=params, json={"status": status}, prefer="return=representation"
+        )
+
+    async def insert_trips(self, trips: list) -> list:
+        """
+        Insert many trips in one request. PostgREST runs it as a single
+        statement, so either every row is inserted or none is.
+        """
+        if not trips:
+            return []
+
+        # Rows may carry different keys. With ?columns= PostgREST would write
+        # NULL for a listed key a row lacks; missing=default uses the column
+        # default instead
+        columns = ",".join(dict.fromkeys(key for trip in trips for key in trip))
+        return await self._request(
+            "POST", "trips", params={"columns": columns}, json=trips, prefer="return=representation,missing=default"
+        )
+
+    async def delete_trips(self, user_id: str, trip_ids: list) -> list:
+        """
+        Delete many of one user's trips in a single request.
+
+        Returns:
+            The ids of the rows that were deleted
+        """
+        if not trip_ids:
+            return []
+        return await self._request(
+            "DELETE",
+            "trips",
+            params={"id": in_(trip_ids), "user_id": eq(user_id), "select": "id"},
+            prefer="return=representation",
+        )
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Any, List, Optional, Union
 from pydantic import BaseModel, EmailStr
 
 
@@ -12,3 +12,156 @@ class SignUpSchema(BaseModel):
 class SignInSchema(BaseModel):
     username: str
     password: str
+
+
+class PreferencesSchema(BaseModel):
+    preferred_budget: Optional[str] = None
+    preferred_activities: List[str] = []
+    preferred_regions: List[str] = []
+
+
+class RefreshSchema(BaseModel):
+    refresh_token: str
+
+
+class TripStatusUpdateSchema(BaseModel):
+    id: Union[int, str]
+    status: str
+
+
+class TripBulkSchema(BaseModel):
+    user_id: Union[int, str]
+    creates: List[dict] = []
+    updates: List[TripStatusUpdateSchema] = []
+    deletes: List[Union[int, str]] = []
+
+
+class UserBulkDeleteSchema(BaseModel):
+    user_ids: List[Union[int, str]]
+
+
+class SignUpUser(BaseModel):
+    username: str
+    email: str
+    display_name: str
+
+
+class SignUpResponse(BaseModel):
+    message: str
+    user: SignUpUser
+
+
+class TokenPairResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
+    expires_in: int
+
+
+class SignInUser(BaseModel):
+    id: Union[int, str]
+    username: str
+    email: Optional[str] = None
+    display_name: Optional[str] = None
+
+
+class SignInResponse(BaseModel):
+    message: str
+    user: SignInUser
+    # Only present when signed tokens are enabled
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    token_type: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class UserProfileResponse(BaseModel):
+    id: Union[int, str]
+    username: str
+    email: Optional[str] = None
+    display_name: Optional[str] = None
+    created_at: Optional[Any] = None
+    preferred_budget: Optional[str] = None
+    preferred_activities: Optional[List[str]] = []
+    preferred_regions: Optional[List[str]] = []
+
+
+class PreferencesResponse(BaseModel):
+    message: str
+    preferences: PreferencesSchema
+    # Only present when signed tokens are enabled
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    token_type: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class AdminUserResponse(BaseModel):
+    id: Union[int, str]
+    username: Optional[str] = None
+    email: Optional[str] = None
+    display_name: Optional[str] = None
+    created_at: Optional[Any] = None
+
+
+class AdminUserPage(BaseModel):
+    items: List[AdminUserResponse]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class DestinationResponse(BaseModel):
+    id: Union[int, str]
+    name: str
+    country: str
+    description: Optional[str] = None
+    activities: Optional[List[str]] = None
+    travel_style: Optional[str] = None
+    budget: Optional[str] = None
+    activity_tags: Optional[List[str]] = None
+    match_score: Optional[int] = None
+
+
+class RecommendationPage(BaseModel):
+    items: List[DestinationResponse]
+    next_cursor: Optional[str] = None
+    total: int
+
+
+class TripResponse(BaseModel):
+    # Every column is optional: ?fields= and ?summary= choose which ones come back
+    id: Optional[Union[int, str]] = None
+    user_id: Optional[Union[int, str]] = None
+    destination: Optional[str] = None
+    destination_id: Optional[Union[int, str]] = None
+    country: Optional[str] = None
+    trip_date: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    image: Optional[str] = None
+    description: Optional[str] = None
+    activities: Optional[List[str]] = None
+    status: Optional[str] = None
+    created_at: Optional[str] = None
+
+
+class TripPage(BaseModel):
+    items: List[TripResponse]
+    next_cursor: Optional[str] = None
+
+
+class AdminDestinationResponse(BaseModel):
+    id: Union[int, str]
+    name: Optional[str] = None
+    country: Optional[str] = None
+    description: Optional[str] = None
+    activities: Optional[List[str]] = None
+    travel_style: Optional[str] = None
+    budget: Optional[str] = None
+    active: Optional[bool] = None
+
+
+class AdminDestinationPage(BaseModel):
+    items: List[AdminDestinationResponse]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
@@ -0,0 +1,47 @@
+-- Indexes for the paginated admin listings (GET /admin/users, GET /admin/destinations).
+--
+-- Search sends `column ILIKE 'q%'` through PostgREST. A plain btree cannot
+-- serve a case-insensitive prefix match on the raw column, so these use
+-- trigram GIN indexes, which handle ILIKE prefix patterns.
+--
+-- Run once in the Supabase SQL editor. CONCURRENTLY avoids locking the
+-- tables; it cannot run inside a transaction block.
+
+create extension if not exists pg_trgm;
+
+create index concurrently if not exists users_username_trgm_idx
+    on public.users using gin (username gin_trgm_ops);
+create index concurrently if not exists users_email_trgm_idx
+    on public.users using gin (email gin_trgm_ops);
+
+create index concurrently if not exists destinations_name_trgm_idx
+    on public.destinations using gin (name gin_trgm_ops);
+create index concurrently if not exists destinations_country_trgm_idx
+    on public.destinations using gin (country gin_trgm_ops);
+
+-- Keyset paging: ORDER BY <sort> [ASC|DESC] NULLS LAST, id ASC, one index
+-- per sort key and direction in admin.USER_SORTS / DESTINATION_SORTS.
+-- A btree scanned backwards flips NULLS LAST and the id tie-break, so the
+-- descending sorts need their own (<sort> desc nulls last, id) indexes.
+-- Sorting by id alone uses the primary key in either direction.
+create index concurrently if not exists users_username_id_idx
+    on public.users (username nulls last, id);
+create index concurrently if not exists users_username_desc_id_idx
+    on public.users (username desc nulls last, id);
+create index concurrently if not exists users_email_id_idx
+    on public.users (email nulls last, id);
+create index concurrently if not exists users_email_desc_id_idx
+    on public.users (email desc nulls last, id);
+create index concurrently if not exists users_created_at_id_idx
+    on public.users (created_at nulls last, id);
+create index concurrently if not exists users_created_at_desc_id_idx
+    on public.users (created_at desc nulls last, id);
+
+create index concurrently if not exists destinations_name_id_idx
+    on public.destinations (name nulls last, id);
+create index concurrently if not exists destinations_name_desc_id_idx
+    on public.destinations (name desc nulls last, id);
+create index concurrently if not exists destinations_country_id_idx
+    on public.destinations (country nulls last, id);
+create index concurrently if not exists destinations_country_desc_id_idx
+    on public.destinations (country desc nulls last, id);
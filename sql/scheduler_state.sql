@@ -0,0 +1,13 @@
+-- Watermarks for scheduled tasks, one row per task.
+--
+-- The trip status reconciler (trip_status.py) stores the date of its last
+-- run under name = 'trip_status', so a restart or a new worker resumes from
+-- that date instead of rescanning every dated trip. Without this table the
+-- reconciler still works, but every process starts with a full scan.
+--
+-- Run once in the Supabase SQL editor.
+
+create table if not exists public.scheduler_state (
+    name text primary key,
+    last_run date not null
+);
@@ -0,0 +1,16 @@
+-- Idempotency key for trips created by background jobs (the AI chat's
+-- auto-created trips).
+--
+-- The job queue retries failed inserts. If an attempt commits but its
+-- response is lost (e.g. a read timeout), the retry sends the same key with
+-- `on_conflict=idempotency_key` and `Prefer: resolution=ignore-duplicates`,
+-- so it becomes a no-op instead of a duplicate trip. Rows created elsewhere
+-- leave the key NULL; NULLs never conflict in a unique index.
+--
+-- Run once in the Supabase SQL editor. CONCURRENTLY avoids locking the
+-- table; it cannot run inside a transaction block.
+
+alter table public.trips add column if not exists idempotency_key text;
+
+create unique index concurrently if not exists trips_idempotency_key_key
+    on public.trips (idempotency_key);
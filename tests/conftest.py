@@ -0,0 +1,118 @@
+import os
+
+# Must be set before the app modules are imported
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("ACCESS_LOG", "0")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+import httpx
+import pytest
+
+import ai_chat
+from app import app
+from cache import CatalogCache
+from jobs import JobQueue
+from llm_gateway import LLMGateway
+from models import hash_password
+from ranking import RecommendationEngine
+from recommendations import load_catalog
+from repository import SupabaseRepository
+from trip_status import TripStatusReconciler
+
+from benchmarks.fake_llm import FakeGroq
+from benchmarks.fake_postgrest import FakePostgrest
+
+PASSWORD = "secret-password"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def password_hash():
+    return hash_password(PASSWORD)
+
+
+@pytest.fixture
+def fake_db(password_hash):
+    """
+    In-memory PostgREST with two users, a small catalog and a few trips.
+    Tests add or change rows before their first request.
+    """
+    users = [
+        {
+            "id": user_id,
+            "username": f"user{user_id}",
+            "email": f"user{user_id}@example.com",
+            "display_name": f"User {user_id}",
+            "password_hash": password_hash,
+            "created_at": "2025-01-01T00:00:00+00:00",
+            "preferred_budget": "low",
+            "preferred_activities": ["nature"],
+            "preferred_regions": ["Japan"],
+        }
+        for user_id in (1, 2)
+    ]
+    destinations = [
+        {
+            "id": destination_id,
+            "name": name,
+            "country": country,
+            "description": f"{name} in {country}",
+            "activities": ["hiking"],
+            "travel_style": "nature",
+            "budget": budget,
+            "activity_tags": ["nature"],
+            "active": True,
+        }
+        for destination_id, name, country, budget in (
+            (1, "Kyoto", "Japan", "low"),
+            (2, "Lima", "Peru", "moderate"),
+            (3, "Reykjavik", "Iceland", "high"),
+        )
+    ]
+    trips = [
+        {
+            "id": trip_id, "user_id": "1", "destination": "Kyoto", "destination_id": 1, "country": "Japan",
+            "trip_date": "2025-03-01", "start_date": "2025-03-01", "end_date": "2025-03-05",
+            "image": None, "description": None, "activities": [], "status": "planning",
+            "created_at": "2025-01-01T00:00:00+00:00",
+        }
+        for trip_id in (1, 2)
+    ]
+    return FakePostgrest({"users": users, "destinations": destinations, "trips": trips, "user_preferences": []})
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    llm = FakeGroq(latency=0.0, first_token_latency=0.0, chunks=5)
+    monkeypatch.setattr(ai_chat, "client", llm)
+    return llm
+
+
+@pytest.fixture
+async def client(fake_db, fake_llm, monkeypatch):
+    """
+    The app wired to the fakes the way the lifespan wires the real backends.
+    """
+    repository = SupabaseRepository("http://fake-postgrest", "test", client=fake_db.client())
+    app.state.repository = repository
+    app.state.catalog = CatalogCache(lambda: load_catalog(repository))
+    app.state.recommender = RecommendationEngine(repository)
+    app.state.trip_status = TripStatusReconciler(repository)
+    app.state.jobs = JobQueue()
+    app.state.jobs.start()
+
+    # Fresh breaker and cache per test
+    monkeypatch.setattr(ai_chat, "llm_gateway", LLMGateway())
+    ai_chat.chat_cache.clear()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+
+    await app.state.jobs.drain()
+    await repository.aclose()
@@ -0,0 +1,137 @@
+import logging
+
+import pytest
+
+import admin
+
+pytestmark = pytest.mark.anyio
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+async def test_user_delete_audit_lines_reach_the_configured_handler(client, fake_db):
+    # The app configures "tripolingo" at startup; audit lines must reach it at INFO
+    records = Records()
+    app_logger = logging.getLogger("tripolingo")
+    app_logger.addHandler(records)
+    try:
+        response = await client.delete("/admin/users/1")
+    finally:
+        app_logger.removeHandler(records)
+
+    assert response.status_code == 200, response.text
+    assert admin.logger.isEnabledFor(logging.INFO)
+    assert records.messages == ["Deleting 1 user(s): 1", "Deleted 1 user(s), 2 trip(s), 0 preference row(s)"]
+
+
+@pytest.fixture
+def many_users(fake_db):
+    """
+    Users 3-9 next to users 1-2: three share a NULL username and one name
+    holds a LIKE wildcard.
+    """
+    for user_id, username in ((3, "ann"), (4, None), (5, "zoe"), (6, None), (7, "user_1"), (8, "userX1"), (9, None)):
+        fake_db.tables["users"].append({"id": user_id, "username": username, "email": f"u{user_id}@example.com"})
+    fake_db._invalidate("users")
+
+
+async def test_descending_keyset_pages_have_no_gaps_or_duplicates(client, many_users):
+    seen, cursor = [], None
+    while True:
+        params = {"sort": "-username", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/admin/users", params=params)).json()
+        seen.extend(user["id"] for user in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # DESC NULLS LAST, ties (the NULL usernames) broken by ascending id across page boundaries
+    assert seen == [5, 7, 8, 2, 1, 3, 4, 6, 9]
+
+
+async def test_exact_count_is_read_from_content_range(client, many_users):
+    first = (await client.get("/admin/users", params={"limit": 4, "count": "exact"})).json()
+    assert first["total"] == 9 and len(first["items"]) == 4
+
+    second = (await client.get("/admin/users", params={"cursor": first["next_cursor"], "count": "exact"})).json()
+    assert second["total"] is None
+
+
+async def test_cursor_from_another_sort_is_rejected(client, many_users):
+    page = (await client.get("/admin/users", params={"sort": "username", "limit": 2})).json()
+
+    response = await client.get("/admin/users", params={"sort": "-username", "cursor": page["next_cursor"]})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor was issued for a different sort"
+    assert (await client.get("/admin/users", params={"cursor": "not-a-cursor"})).status_code == 400
+
+
+async def test_search_takes_like_wildcards_literally(client, many_users):
+    users = (await client.get("/admin/users", params={"q": "user_1"})).json()
+    assert [user["username"] for user in users] == ["user_1"]
+
+    users = (await client.get("/admin/users", params={"q": "user%"})).json()
+    assert users == []
+
+
+@pytest.fixture
+def deletes(fake_db, monkeypatch):
+    """
+    Record the table of every DELETE; tables listed in `failing` answer 500.
+    """
+    calls = {"tables": [], "failing": set()}
+    handle = fake_db.handle
+
+    async def record(request):
+        if request.method == "DELETE":
+            table = request.url.path.rsplit("/", 1)[-1]
+            calls["tables"].append(table)
+            if table in calls["failing"]:
+                return fake_db._error(500, "57014", "canceling statement due to statement timeout")
+        return await handle(request)
+
+    monkeypatch.setattr(fake_db, "handle", record)
+    return calls
+
+
+async def test_user_delete_clears_children_before_the_user(client, fake_db, deletes):
+    fake_db.tables["user_preferences"].append({"id": 1, "user_id": "1", "activities": ["food"]})
+
+    response = await client.delete("/admin/users/1")
+
+    assert response.json()["deleted"] == {"trips": 2, "preferences": 1, "users": ["1"]}
+    assert sorted(deletes["tables"][:2]) == ["trips", "user_preferences"] and deletes["tables"][2:] == ["users"]
+    assert fake_db.tables["trips"] == [] and [user["id"] for user in fake_db.tables["users"]] == [2]
+
+
+async def test_deleting_an_unknown_user_is_404(client, deletes):
+    response = await client.delete("/admin/users/99")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "User not found"
+
+
+async def test_failed_child_delete_keeps_the_user(client, fake_db, deletes):
+    deletes["failing"].add("trips")
+
+    response = await client.delete("/admin/users/1")
+
+    assert response.status_code == 500
+    assert "statement timeout" in response.json()["detail"]
+    assert "users" not in deletes["tables"]
+    assert [user["id"] for user in fake_db.tables["users"]] == [1, 2]
+
+
+async def test_bulk_delete_lists_unknown_ids(client, deletes):
+    response = await client.post("/admin/users/delete", json={"user_ids": [2, "99", 2]})
+
+    body = response.json()
+    assert body["deleted"]["users"] == ["2"]
+    assert body["not_found"] == ["99"]
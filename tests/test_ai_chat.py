@@ -0,0 +1,130 @@
+import asyncio
+import io
+import json
+import logging
+import time
+
+import httpx
+import pytest
+
+from app import app
+from metrics import JsonLogFormatter
+
+pytestmark = pytest.mark.anyio
+
+
+async def stream_chat(path: str, message: str) -> list:
+    """
+    Call the app over raw ASGI and return (seconds, event) for every
+    NDJSON line, timed when its chunk left the app.
+    """
+    body = json.dumps({"message": message}).encode("utf-8")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    requests = [{"type": "http.request", "body": body, "more_body": False}]
+    finished = asyncio.Event()
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # The client stays connected until the response is complete
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    started_at = time.perf_counter()
+    events = []
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            for line in message.get("body", b"").splitlines():
+                events.append((time.perf_counter() - started_at, json.loads(line)))
+
+    await app(scope, receive, send)
+    finished.set()
+    return events
+
+
+async def test_stream_forwards_tokens_before_generation_finishes(client, fake_llm):
+    fake_llm.first_token_latency = 0.02
+    fake_llm.latency = 0.3
+
+    events = await stream_chat("/ai/chat/1/stream", "Suggest places in Japan")
+    tokens = [(at, event) for at, event in events if event["type"] == "token"]
+    done_at, done = events[-1]
+
+    assert len(tokens) > 1
+    assert tokens[0][0] < done_at / 2
+    assert done["type"] == "done"
+    assert done["reply"] == "".join(event["content"] for _, event in tokens).strip()
+    assert done["suggested_destinations"] == [] and done["trip_created"] is None
+
+
+async def test_stream_final_event_carries_the_created_trip(client):
+    events = await stream_chat("/ai/chat/1/stream", "Plan a trip to Kyoto")
+    _, done = events[-1]
+
+    assert done["type"] == "done"
+    assert done["trip_created"]["destination"] == "Kyoto"
+    assert done["trip_created"]["job_id"]
+
+
+async def test_stream_reports_upstream_failure_in_final_event(client, fake_llm):
+    async def broken(*args, **kwargs):
+        raise ConnectionError("groq down")
+
+    fake_llm.chat.completions.create = broken
+
+    events = await stream_chat("/ai/chat/1/stream", "Suggest places in Peru")
+
+    assert [event["type"] for _, event in events] == ["done"]
+    assert "unavailable" in events[0][1]["reply"]
+
+
+async def test_upstream_failure_is_logged_as_json(client, fake_llm):
+    async def broken(*args, **kwargs):
+        raise ConnectionError("groq down")
+
+    fake_llm.chat.completions.create = broken
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonLogFormatter())
+    app_logger = logging.getLogger("tripolingo")
+    app_logger.addHandler(handler)
+    try:
+        await client.post("/ai/chat/1", json={"message": "Suggest places in Peru"})
+    finally:
+        app_logger.removeHandler(handler)
+
+    [line] = stream.getvalue().splitlines()
+    record = json.loads(line)
+    assert record["event"] == "chat_llm_error" and record["logger"] == "tripolingo.ai_chat"
+    assert record["level"] == "warning" and record["error"] == "groq down"
+    assert isinstance(record["ts"], float)
+
+
+async def test_retried_trip_insert_does_not_duplicate_the_trip(client, fake_db, monkeypatch):
+    jobs = app.state.jobs
+    monkeypatch.setattr(jobs, "retry_delay", 0.01)
+    handle = fake_db.handle
+    lost = []
+
+    async def commit_then_time_out(request):
+        response = await handle(request)
+        if request.method == "POST" and request.url.path.endswith("/trips") and not lost:
+            # The row is committed, but the response never reaches the job
+            lost.append(request)
+            raise httpx.ReadTimeout("response lost", request=request)
+        return response
+
+    monkeypatch.setattr(fake_db, "handle", commit_then_time_out)
+
+    events = await stream_chat("/ai/chat/2/stream", "Plan a trip to Kyoto")
+    await jobs.drain()
+
+    job = jobs.get(events[-1][1]["trip_created"]["job_id"])
+    assert job.status == "succeeded" and job.attempts == 2
+    assert [trip["destination"] for trip in fake_db.tables["trips"] if trip["user_id"] == "2"] == ["Kyoto"]
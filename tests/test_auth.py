@@ -0,0 +1,107 @@
+import httpx
+import pytest
+
+from tests.conftest import PASSWORD
+from tokens import TokenError, TokenService, token_service
+
+pytestmark = pytest.mark.anyio
+
+SIGNUP = {"display_name": "New", "username": "new", "email": "new@example.com", "password": "secret-password"}
+
+
+@pytest.fixture
+def insert_error(fake_db, monkeypatch):
+    """
+    Make the next users insert fail with the given PostgREST error.
+    """
+    errors = []
+    handle = fake_db.handle
+
+    async def failing(request):
+        if request.method == "POST" and request.url.path.endswith("/users") and errors:
+            status_code, code, message = errors.pop()
+            return httpx.Response(status_code, json={"code": code, "message": message, "details": None})
+        return await handle(request)
+
+    monkeypatch.setattr(fake_db, "handle", failing)
+    return errors
+
+
+async def test_signup_race_on_unique_email_reports_the_email(client, insert_error):
+    insert_error.append((409, "23505", 'duplicate key value violates unique constraint "users_email_key"'))
+
+    response = await client.post("/auth/signup", json=SIGNUP)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already exists"
+
+
+async def test_other_conflicts_are_not_reported_as_duplicates(client, insert_error):
+    insert_error.append((409, "23503", 'insert violates foreign key constraint "users_team_id_fkey"'))
+
+    response = await client.post("/auth/signup", json=SIGNUP)
+
+    assert "already exists" not in response.json()["detail"]
+    assert "foreign key" in response.json()["detail"]
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_signin_issues_a_token_pair(client):
+    response = await client.post("/auth/signin", json={"username": "user1", "password": PASSWORD})
+
+    body = response.json()
+    assert response.status_code == 200 and body["token_type"] == "bearer"
+    claims = token_service.decode(body["access_token"])
+    assert claims["sub"] == "1" and claims["prefs"]["preferred_regions"] == ["Japan"]
+    assert token_service.decode(body["refresh_token"], "refresh")["sub"] == "1"
+
+
+def test_tokens_signed_with_a_rotated_out_key_still_verify():
+    old = TokenService([("2024", "old-secret")])
+    rotated = TokenService([("2025", "new-secret"), ("2024", "old-secret")])
+
+    token = old.issue_access({"id": 1})
+    assert rotated.decode(token)["sub"] == "1"
+    # New tokens are signed with the first key only
+    with pytest.raises(TokenError, match="Unknown signing key"):
+        old.decode(rotated.issue_access({"id": 1}))
+
+
+def test_expired_tokens_and_refresh_tokens_are_not_access_tokens():
+    service = TokenService([("k1", "secret")], access_ttl=-10)
+
+    with pytest.raises(TokenError, match="expired"):
+        service.decode(service.issue_access({"id": 1}))
+    with pytest.raises(TokenError, match="Wrong token type"):
+        service.decode(service.issue_refresh(1), "access")
+
+
+async def test_refresh_token_is_rejected_as_a_bearer_token(client):
+    response = await client.get("/auth/user/1", headers=bearer(token_service.issue_refresh(1)))
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid token: Wrong token type"
+
+
+async def test_refresh_for_a_deleted_user_is_unauthorized(client):
+    refresh_token = token_service.issue_refresh(2)
+    fresh = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert fresh.status_code == 200 and token_service.decode(fresh.json()["access_token"])["sub"] == "2"
+
+    assert (await client.delete("/admin/users/2")).status_code == 200
+    response = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User no longer exists"
+
+
+async def test_token_for_another_user_is_forbidden(client):
+    token = token_service.issue_access({"id": 2, "username": "user2"})
+
+    assert (await client.get("/auth/user/2", headers=bearer(token))).status_code == 200
+    response = await client.get("/auth/user/1", headers=bearer(token))
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Token does not match user"
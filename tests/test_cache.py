@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from cache import CatalogCache
+
+pytestmark = pytest.mark.anyio
+
+
+class CountingLoader:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self) -> list:
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        await asyncio.sleep(self.latency)
+        return [{"id": 1, "name": "Kyoto", "version": self.calls}]
+
+
+async def test_concurrent_misses_share_one_refresh():
+    loader = CountingLoader(latency=0.02)
+    cache = CatalogCache(loader)
+
+    results = await asyncio.gather(*(cache.get() for _ in range(10)))
+
+    assert loader.calls == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 9
+
+
+async def test_catalog_reloads_after_the_ttl():
+    loader = CountingLoader()
+    cache = CatalogCache(loader, ttl=0.05)
+
+    await cache.get()
+    await cache.get()
+    assert loader.calls == 1
+
+    await asyncio.sleep(0.06)
+    assert (await cache.get())[0]["version"] == 2
+    assert loader.calls == 2
+
+
+async def test_invalidation_during_a_refresh_forces_another_reload():
+    loader = CountingLoader()
+    loader.release = asyncio.Event()
+    cache = CatalogCache(loader)
+
+    refresh = asyncio.create_task(cache.get())
+    await asyncio.sleep(0)
+    # An admin write lands while the loader is still running
+    cache.invalidate()
+    loader.release.set()
+
+    # The in-flight copy is served once, but it may predate the write
+    assert (await refresh)[0]["version"] == 1
+    assert (await cache.get())[0]["version"] == 2
+    assert (await cache.get())[0]["version"] == 2
+    assert loader.calls == 2
@@ -0,0 +1,85 @@
+import gzip
+import json
+
+import httpx
+import pytest
+
+from compression import CompressionMiddleware, negotiate_encoding
+
+pytestmark = pytest.mark.anyio
+
+LARGE = json.dumps([{"name": f"Destination {index}"} for index in range(200)]).encode("utf-8")
+
+
+def test_negotiation_honours_q_values_and_wildcards():
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0") == "gzip"
+    assert negotiate_encoding("br;q=0.5, gzip") == "gzip"
+    assert negotiate_encoding("*") == "br"
+    assert negotiate_encoding("*;q=0, gzip") == "gzip"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding(None) is None
+
+
+def asgi_app(*chunks: bytes, content_type: str = "application/json", headers: list = ()):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", content_type.encode())] + list(headers),
+        })
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+
+    return app
+
+
+async def get(app, accept_encoding: str = "gzip") -> httpx.Response:
+    transport = httpx.ASGITransport(app=CompressionMiddleware(app, minimum_size=1024))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async with client.stream("GET", "/", headers={"Accept-Encoding": accept_encoding}) as response:
+            response.raw_body = b"".join([chunk async for chunk in response.aiter_raw()])
+    return response
+
+
+async def test_large_json_is_compressed():
+    response = await get(asgi_app(LARGE))
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.raw_body) == LARGE
+
+
+async def test_small_bodies_are_sent_as_is():
+    response = await get(asgi_app(b'{"ok":true}'))
+
+    assert "content-encoding" not in response.headers
+    assert response.raw_body == b'{"ok":true}'
+    # Still varies: a larger body from the same URL could be compressed
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+async def test_ndjson_streams_pass_through_uncompressed():
+    chunks = [LARGE[:2000] + b"\n", LARGE[2000:] + b"\n"]
+    response = await get(asgi_app(*chunks, content_type="application/x-ndjson"))
+
+    assert "content-encoding" not in response.headers
+    assert response.raw_body == b"".join(chunks)
+
+
+async def test_precompressed_bodies_are_left_alone():
+    body = gzip.compress(LARGE)
+    response = await get(asgi_app(body, headers=[(b"content-encoding", b"gzip")]), accept_encoding="gzip, br")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.raw_body == body
+
+
+async def test_ranked_not_modified_varies_on_accept_encoding(client):
+    params = {"regions": "Peru", "limit": 2}
+    first = await client.get("/recommendations/1", params=params)
+    assert first.status_code == 200 and first.headers["vary"] == "Accept-Encoding"
+
+    cached = await client.get("/recommendations/1", params=params, headers={"If-None-Match": first.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.headers["vary"] == "Accept-Encoding"
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+import ai_chat
+from benchmarks.fake_llm import FakeGroq
+from llm_gateway import CircuitBreaker, LLMGateway, UpstreamUnavailable
+
+pytestmark = pytest.mark.anyio
+
+
+def completion(llm: FakeGroq, prompt: str = "hi"):
+    return lambda: llm.chat.completions.create(model="test", messages=[{"role": "user", "content": prompt}])
+
+
+async def failing():
+    raise ConnectionError("upstream error")
+
+
+async def test_concurrency_cap_rejects_callers_that_wait_too_long():
+    gateway = LLMGateway(max_concurrency=2, queue_timeout=0.05)
+    llm = FakeGroq(latency=0.2)
+
+    results = await asyncio.gather(
+        *(gateway.complete(None, completion(llm)) for _ in range(3)), return_exceptions=True
+    )
+
+    assert sum(isinstance(result, UpstreamUnavailable) for result in results) == 1
+    assert gateway.stats()["rejected"] == 1
+    assert llm.calls == 2
+
+
+async def test_slow_calls_time_out():
+    gateway = LLMGateway(timeout=0.05)
+
+    with pytest.raises(UpstreamUnavailable):
+        await gateway.complete(None, completion(FakeGroq(latency=0.5)))
+
+    assert gateway.stats()["timeouts"] == 1
+
+
+async def test_breaker_opens_then_fails_fast_and_recovers():
+    gateway = LLMGateway(breaker=CircuitBreaker(threshold=2, reset_timeout=0.1))
+    llm = FakeGroq(latency=0.0)
+
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailable):
+            await gateway.complete(None, failing)
+    assert gateway.breaker.state == "open"
+
+    with pytest.raises(UpstreamUnavailable):
+        await gateway.complete(None, completion(llm))
+    assert llm.calls == 0 and gateway.stats()["short_circuited"] == 1
+
+    await asyncio.sleep(0.1)
+    await gateway.complete(None, completion(llm))
+    assert gateway.breaker.state == "closed"
+
+
+async def test_identical_in_flight_prompts_share_one_call():
+    gateway = LLMGateway()
+    llm = FakeGroq(latency=0.05)
+
+    results = await asyncio.gather(*(gateway.complete("same", completion(llm)) for _ in range(5)))
+
+    assert llm.calls == 1
+    assert gateway.stats()["coalesced"] == 4
+    assert len({id(result) for result in results}) == 1
+    assert gateway.stats()["latency_seconds"]["count"] == 1
+
+
+async def test_chat_replies_unavailable_while_breaker_is_open(client, fake_llm, monkeypatch):
+    gateway = LLMGateway(breaker=CircuitBreaker(threshold=1, reset_timeout=60))
+    monkeypatch.setattr(ai_chat, "llm_gateway", gateway)
+    with pytest.raises(UpstreamUnavailable):
+        await gateway.complete(None, failing)
+
+    response = await client.post("/ai/chat/1", json={"message": "Suggest places in Peru"})
+
+    assert response.json()["reply"] == ai_chat.UNAVAILABLE_REPLY
+    assert fake_llm.calls == 0
@@ -0,0 +1,71 @@
+from matcher import DestinationMatcher
+
+CATALOG = [
+    {"id": 1, "name": "Bali", "country": "Indonesia"},
+    {"id": 2, "name": "New York", "country": "USA"},
+    {"id": 3, "name": "Kyoto", "country": "Japan"},
+]
+
+
+def matcher_for(destinations, version="v1", seeds=()) -> DestinationMatcher:
+    matcher = DestinationMatcher(seeds)
+    matcher.sync(destinations, version)
+    return matcher
+
+
+def test_terms_only_match_whole_words():
+    matcher = matcher_for(CATALOG)
+
+    assert matcher.best_match("I love Balinese food") is None
+    assert matcher.best_match("Off to bali!")["id"] == 1
+
+
+def test_multi_word_names_match():
+    matcher = matcher_for(CATALOG)
+
+    assert matcher.best_match("A week in new york please")["name"] == "New York"
+    assert matcher.best_match("Somewhere new") is None
+
+
+def test_destination_names_outrank_countries():
+    matcher = matcher_for(CATALOG)
+
+    match = matcher.best_match("Japan sounds great, maybe Kyoto")
+    assert match["kind"] == "name" and match["id"] == 3
+    assert matcher.best_match("What about Japan?")["kind"] == "country"
+
+
+def test_sync_applies_only_the_catalog_diff():
+    matcher = matcher_for(CATALOG)
+    matcher.best_match("warm up")
+    compiles = matcher.compiles
+
+    matcher.sync(CATALOG, "v1")
+    matcher.best_match("Kyoto")
+    assert matcher.compiles == compiles
+
+    matcher.sync(CATALOG + [{"id": 4, "name": "Lima", "country": "Peru"}], "v2")
+    assert matcher.best_match("Plan Lima")["id"] == 4
+    assert matcher.compiles == compiles + 1
+
+
+def test_removed_destinations_stop_matching():
+    matcher = matcher_for(CATALOG, seeds=("Bali",))
+
+    matcher.sync(CATALOG[1:], "v2")
+    assert matcher.best_match("Indonesia") is None
+    # A seed term survives its catalog destination
+    assert matcher.best_match("Bali")["kind"] == "seed"
+    assert matcher.best_match("Kyoto")["id"] == 3
+
+
+def test_removing_one_of_two_same_named_destinations_keeps_the_name():
+    twins = [{"id": 1, "name": "Santiago", "country": "Chile"}, {"id": 2, "name": "Santiago", "country": "Spain"}]
+    matcher = matcher_for(twins)
+    assert matcher.best_match("Trip to Santiago")["id"] == 2
+
+    matcher.sync(twins[:1], "v2")
+    assert matcher.best_match("Trip to Santiago") == {"name": "Santiago", "country": "Chile", "id": 1, "kind": "name"}
+
+    matcher.sync([], "v3")
+    assert matcher.best_match("Trip to Santiago") is None
@@ -0,0 +1,94 @@
+import pytest
+
+from projections import PROJECTIONS, ProjectedRow, UnprojectedColumn, projection
+from repository import SupabaseRepository
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def violations(monkeypatch):
+    """
+    Record every read of an unprojected column, including ones a handler
+    catches and turns into a fallback (e.g. the chat context lookup).
+    """
+    seen = []
+
+    def record(method):
+        def wrapper(self, key, *args):
+            try:
+                return method(self, key, *args)
+            except UnprojectedColumn:
+                seen.append(key)
+                raise
+        return wrapper
+
+    monkeypatch.setattr(ProjectedRow, "__getitem__", record(ProjectedRow.__getitem__))
+    monkeypatch.setattr(ProjectedRow, "get", record(ProjectedRow.get))
+    return seen
+
+
+@pytest.fixture
+def selects(fake_db, monkeypatch):
+    """
+    Record the select= list of every read the fake serves, by table.
+    """
+    seen = []
+    handle = fake_db.handle
+
+    async def recording(request):
+        if request.method == "GET":
+            seen.append((request.url.path.rsplit("/", 1)[-1], request.url.params.get("select")))
+        return await handle(request)
+
+    monkeypatch.setattr(fake_db, "handle", recording)
+    return seen
+
+
+async def test_projected_row_rejects_unselected_columns(fake_db):
+    repository = SupabaseRepository("http://fake-postgrest", "test", client=fake_db.client())
+
+    user = await repository.get_user_by_id(1, projection("auth.profile"))
+
+    assert user["username"] == "user1"
+    with pytest.raises(UnprojectedColumn):
+        user["password_hash"]
+    with pytest.raises(UnprojectedColumn):
+        user.get("password_hash")
+    await repository.aclose()
+
+
+async def test_handlers_only_read_projected_columns(client, violations, selects):
+    signup = await client.post("/auth/signup", json={
+        "display_name": "New", "username": "new", "email": "new@example.com", "password": "secret-password",
+    })
+    assert signup.status_code == 200, signup.text
+
+    signin = await client.post("/auth/signin", json={"username": "user1", "password": "secret-password"})
+    assert signin.status_code == 200, signin.text
+
+    refresh = await client.post("/auth/refresh", json={"refresh_token": signin.json()["refresh_token"]})
+    assert refresh.status_code == 200, refresh.text
+
+    responses = [
+        await client.get("/auth/user/1"),
+        await client.put("/auth/user/1/preferences", json={"preferred_budget": "high"}),
+        await client.get("/recommendations/2"),
+        await client.post("/ai/chat/2", json={"message": "Suggest places in Japan"}),
+        await client.get("/admin/users"),
+        await client.get("/admin/destinations"),
+        await client.patch("/admin/destinations/1"),
+        await client.post("/admin/trips/reconcile", params={"full": "true"}),
+    ]
+    for response in responses:
+        assert response.status_code == 200, (response.request.url, response.text)
+
+    assert violations == []
+    # Every read named its columns; nothing fell back to select=*
+    assert selects and all(select and select != "*" for _, select in selects)
+
+
+async def test_projection_names_are_unique_per_table():
+    for name, entry in PROJECTIONS.items():
+        assert len(entry.columns) == len(set(entry.columns)), name
+        assert entry.table in ("users", "destinations", "trips", "scheduler_state"), name
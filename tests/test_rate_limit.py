@@ -0,0 +1,69 @@
+import pytest
+
+import rate_limit
+from rate_limit import RateLimiter, TokenBuckets
+from tokens import token_service
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = RateLimiter({"ai_chat": {"user": "2/60", "ip": "4/60"}}, enabled=True)
+    monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+    return limiter
+
+
+def bearer(user_id) -> dict:
+    token = token_service.issue_access({"id": user_id, "username": f"user{user_id}"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_bucket_refills_and_evicts_idle_keys():
+    buckets = TokenBuckets(2, 10, max_keys=3)
+
+    assert buckets.take("a", now=0) == 0
+    assert buckets.take("a", now=0) == 0
+    assert buckets.take("a", now=0) == pytest.approx(5.0)
+    # Half the period refills one token
+    assert buckets.take("a", now=5) == 0
+
+    for key in "bcd":
+        buckets.take(key, now=6)
+    assert buckets.stats()["keys"] == 3
+
+    # A full period later every bucket is back to capacity and dropped
+    buckets.take("z", now=100)
+    assert buckets.stats()["keys"] == 1
+
+
+async def test_guests_are_limited_by_ip_only(client, limiter):
+    codes = [(await client.post("/ai/chat/null", json={"message": "hi"})).status_code for _ in range(5)]
+
+    assert codes == [200, 200, 200, 200, 429]
+    assert limiter.stats()["policies"]["ai_chat:user"]["keys"] == 0
+
+
+async def test_path_id_does_not_drain_the_users_bucket(client, limiter):
+    # Unauthenticated posts naming user 2 only spend the caller's IP tokens
+    for _ in range(3):
+        await client.post("/ai/chat/2", json={"message": "hi"})
+
+    response = await client.post("/ai/chat/2", json={"message": "hi"}, headers=bearer(2))
+    assert response.status_code == 200
+    assert limiter.stats()["policies"]["ai_chat:user"]["allowed"] == 1
+
+    # The IP bucket (4) is now empty
+    limited = await client.post("/ai/chat/2", json={"message": "hi"}, headers=bearer(2))
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+
+
+async def test_user_bucket_follows_the_token(client, limiter):
+    limiter.policies[("ai_chat", "ip")] = TokenBuckets(100, 60)
+
+    for _ in range(2):
+        assert (await client.post("/ai/chat/1", json={"message": "hi"}, headers=bearer(1))).status_code == 200
+    assert (await client.post("/ai/chat/1", json={"message": "hi"}, headers=bearer(1))).status_code == 429
+    # Another signed-in user has their own allowance
+    assert (await client.post("/ai/chat/2", json={"message": "hi"}, headers=bearer(2))).status_code == 200
@@ -0,0 +1,60 @@
+import pytest
+
+from ranking import normalize_budget
+
+pytestmark = pytest.mark.anyio
+
+
+def test_middle_slider_position_is_no_budget_filter():
+    assert normalize_budget("1") == "low"
+    assert normalize_budget("2") is None
+    assert normalize_budget("Moderate") == "moderate"
+
+
+async def test_middle_slider_budget_is_left_out_of_the_score(client, fake_db):
+    user = fake_db.tables["users"][1]
+    user.update(preferred_budget="2", preferred_activities=[], preferred_regions=["Peru"])
+
+    ranked = (await client.get("/recommendations/2")).json()
+    # Only the region scores; "moderate" Lima is not boosted for the budget too
+    assert [(item["name"], item["match_score"]) for item in ranked] == [("Lima", 1), ("Kyoto", 0), ("Reykjavik", 0)]
+
+
+async def test_middle_slider_alone_keeps_catalog_order(client, fake_db):
+    fake_db.tables["users"][1].update(preferred_budget="2", preferred_activities=[], preferred_regions=[])
+
+    ranked = (await client.get("/recommendations/2")).json()
+    assert [item["name"] for item in ranked] == ["Kyoto", "Lima", "Reykjavik"]
+    assert all("match_score" not in item for item in ranked)
+
+    explicit = (await client.get("/recommendations/2", params={"budget": "2"})).json()
+    assert explicit == ranked
+
+
+async def test_explicit_filters_rank_best_matches_first(client):
+    ranked = (await client.get("/recommendations/2", params={"budget": "high", "regions": "Peru"})).json()
+
+    assert [(item["name"], item["match_score"]) for item in ranked] == [("Lima", 1), ("Reykjavik", 1), ("Kyoto", 0)]
+
+
+async def test_pages_follow_the_cursor_to_the_last_page(client):
+    first = (await client.get("/recommendations/2", params={"regions": "Iceland", "limit": 2})).json()
+    assert [item["name"] for item in first["items"]] == ["Reykjavik", "Kyoto"]
+    assert first["total"] == 3 and first["next_cursor"]
+
+    last = (await client.get("/recommendations/2", params={"regions": "Iceland", "cursor": first["next_cursor"]})).json()
+    assert [item["name"] for item in last["items"]] == ["Lima"]
+    assert last["next_cursor"] is None
+
+
+async def test_stale_and_invalid_cursors_are_rejected(client):
+    page = (await client.get("/recommendations/2", params={"limit": 1})).json()
+    await client.post("/admin/destinations", json={"name": "Oslo", "country": "Norway"})
+
+    stale = await client.get("/recommendations/2", params={"cursor": page["next_cursor"]})
+    assert stale.status_code == 400
+    assert stale.json()["detail"] == "Cursor expired, reload the first page"
+
+    invalid = await client.get("/recommendations/2", params={"cursor": "not-a-cursor"})
+    assert invalid.status_code == 400
+    assert invalid.json()["detail"] == "Invalid cursor"
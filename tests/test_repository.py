@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+
+from projections import Projection, projection
+from repository import RepositoryError, SupabaseRepository
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def repository(fake_db):
+    repository = SupabaseRepository("http://fake-postgrest", "test", client=fake_db.client())
+    yield repository
+    await repository.aclose()
+
+
+async def test_user_lookups(repository):
+    by_username = await repository.get_user_by_username("user1", projection("auth.signin"))
+    by_email = await repository.get_user_by_email("user2@example.com", projection("auth.signup"))
+    by_id = await repository.get_user_by_id(2, projection("auth.profile"))
+
+    assert by_username["id"] == 1
+    assert by_email["username"] == "user2"
+    assert by_id["display_name"] == "User 2"
+    assert await repository.get_user_by_id(99, projection("auth.profile")) is None
+
+
+async def test_destination_and_trip_writes_round_trip(repository, fake_db):
+    created = await repository.insert_destination({"name": "Oslo", "country": "Norway", "active": False})
+    destination_id = created[0]["id"]
+
+    active = await repository.list_active_destinations(projection("recommendations.catalog"))
+    assert "Oslo" not in [row["name"] for row in active]
+
+    await repository.update_destination(destination_id, {"active": True})
+    active = await repository.list_active_destinations(projection("recommendations.catalog"))
+    assert "Oslo" in [row["name"] for row in active]
+
+    await repository.insert_trip({"user_id": "2", "destination": "Oslo", "status": "planning"})
+    trips = await repository.list_trips("2", Projection("trips", "id", "destination"))
+    assert [trip["destination"] for trip in trips] == ["Oslo"]
+
+    await repository.delete_trips_by_user("2")
+    assert await repository.list_trips("2", Projection("trips", "id")) == []
+
+
+async def test_postgrest_errors_carry_status_and_code(repository):
+    with pytest.raises(RepositoryError) as error:
+        await repository.insert_user({"username": "user1", "email": "other@example.com"})
+
+    assert error.value.status_code == 409
+    assert error.value.code == "23505"
+
+
+async def test_queries_do_not_block_the_event_loop(fake_db, repository):
+    fake_db.latency = 0.05
+
+    started_at = time.perf_counter()
+    users = await asyncio.gather(*(
+        repository.get_user_by_id(user_id % 2 + 1, projection("auth.profile")) for user_id in range(10)
+    ))
+    elapsed = time.perf_counter() - started_at
+
+    assert all(users)
+    # Ten 50 ms round-trips overlap instead of running back to back
+    assert elapsed < 0.25
+
+
+async def test_in_filters_take_each_id_literally(repository, fake_db):
+    deleted = await repository.delete_trips("1", ["1,2", "2)"])
+
+    assert deleted == []
+    assert len(fake_db.tables["trips"]) == 2
+
+    deleted = await repository.delete_trips("1", ["1", 2])
+    assert sorted(row["id"] for row in deleted) == [1, 2]
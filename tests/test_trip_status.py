@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+
+from repository import SupabaseRepository
+from trip_status import TripStatusReconciler
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def repository(fake_db):
+    repository = SupabaseRepository("http://fake-postgrest", "test", client=fake_db.client())
+    yield repository
+    await repository.aclose()
+
+
+async def test_restarted_reconciler_resumes_from_the_persisted_watermark(repository, fake_db):
+    first = await TripStatusReconciler(repository).run(today=date(2030, 1, 1))
+    assert first["since"] is None
+    assert [row["last_run"] for row in fake_db.tables["scheduler_state"]] == ["2030-01-01"]
+
+    # A new process (restart or another worker) does not rescan every trip
+    restarted = TripStatusReconciler(repository)
+    assert (await restarted.run(today=date(2030, 1, 1)))["checked"] == 0
+    assert (await restarted.run(today=date(2030, 1, 2)))["since"] == "2030-01-01"
+    assert [row["last_run"] for row in fake_db.tables["scheduler_state"]] == ["2030-01-02"]
+
+
+async def test_unreadable_watermark_falls_back_to_a_full_scan(repository, fake_db, monkeypatch):
+    fake_db.tables["scheduler_state"] = [{"name": "trip_status", "last_run": "2030-01-01"}]
+    handle = fake_db.handle
+
+    async def missing_table(request):
+        if request.method == "GET" and request.url.path.endswith("/scheduler_state"):
+            return fake_db._error(404, "42P01", 'relation "public.scheduler_state" does not exist')
+        return await handle(request)
+
+    monkeypatch.setattr(fake_db, "handle", missing_table)
+
+    result = await TripStatusReconciler(repository).run(today=date(2030, 1, 2))
+    assert result["since"] is None
+    assert result["checked"] == 2
+
+
+async def test_start_only_trip_completes_the_day_after_it_starts(repository, fake_db):
+    fake_db.tables["trips"].append(
+        {"id": 3, "user_id": "2", "destination": "Lima", "start_date": "2030-01-05", "status": "planning"}
+    )
+    reconciler = TripStatusReconciler(repository)
+
+    statuses = []
+    for day in range(4, 8):
+        await reconciler.run(today=date(2030, 1, day))
+        statuses.append(fake_db.tables["trips"][2]["status"])
+
+    assert statuses == ["upcoming", "ongoing", "completed", "completed"]
+
+
+async def test_status_updates_are_sent_one_page_at_a_time(repository, fake_db, monkeypatch):
+    fake_db.tables["trips"].extend(
+        {"id": trip_id, "user_id": "2", "destination": "Lima", "start_date": "2030-01-05", "end_date": "2030-01-09",
+         "status": "planning"}
+        for trip_id in range(3, 8)
+    )
+    patched = []
+    handle = fake_db.handle
+
+    async def record(request):
+        if request.method == "PATCH":
+            patched.append(request.url.params["id"])
+        return await handle(request)
+
+    monkeypatch.setattr(fake_db, "handle", record)
+
+    result = await TripStatusReconciler(repository, batch_size=2).run(today=date(2030, 1, 1), full=True)
+
+    assert result["checked"] == 7 and result["by_status"] == {"completed": 2, "upcoming": 5}
+    assert all(ids.count(",") < 2 for ids in patched)
+    assert {trip["status"] for trip in fake_db.tables["trips"][2:]} == {"upcoming"}
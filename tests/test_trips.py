@@ -0,0 +1,88 @@
+import base64
+import json
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_bulk_create_keeps_column_defaults_for_short_rows(client, fake_db):
+    response = await client.post("/trips/bulk", json={
+        "user_id": 1,
+        "creates": [
+            {"destination_id": 2, "status": "wishlist"},
+            {"destination": "Lima", "country": "Peru", "start_date": "2030-01-01", "activities": ["food"]},
+        ],
+    })
+
+    assert response.status_code == 200, response.text
+    short, full = [result["trip"] for result in response.json()["creates"]]
+    # The short row never listed activities, so it gets the column default, not NULL
+    assert short["activities"] == []
+    assert full["activities"] == ["food"]
+
+
+async def test_bulk_create_reports_an_invalid_status_per_item(client, fake_db):
+    response = await client.post("/trips/bulk", json={
+        "user_id": 1,
+        "creates": [{"destination_id": 2, "status": "someday"}, {"destination_id": 3}],
+    })
+
+    body = response.json()
+    assert body["creates"][0] == {"index": 0, "success": False, "error": "Invalid status: someday"}
+    assert body["creates"][1]["success"] is True
+    assert [trip["status"] for trip in fake_db.tables["trips"] if trip.get("destination_id") == 3] == ["wishlist"]
+
+
+@pytest.fixture
+def user_trips(fake_db):
+    for trip_id, status, start in ((11, "upcoming", "2030-01-10"), (12, "completed", "2024-05-01"),
+                                   (13, "wishlist", None), (14, "upcoming", "2030-03-01"), (15, "ongoing", "2026-10-01")):
+        fake_db.tables["trips"].append({
+            "id": trip_id, "user_id": "2", "destination": f"Trip {trip_id}", "country": "Peru",
+            "start_date": start, "end_date": start, "trip_date": start, "status": status,
+            "image": None, "description": "Long text", "activities": [],
+        })
+    fake_db._invalidate("trips")
+
+
+async def test_list_filters_by_status_and_start_date(client, user_trips):
+    by_status = (await client.get("/trips/2", params={"status": "upcoming,completed"})).json()
+    assert sorted(trip["id"] for trip in by_status) == [11, 12, 14]
+
+    in_range = (await client.get("/trips/2", params={"from_date": "2026-01-01", "to_date": "2030-01-31"})).json()
+    assert sorted(trip["id"] for trip in in_range) == [11, 15]
+
+    assert (await client.get("/trips/2", params={"from_date": "soon"})).status_code == 400
+
+
+async def test_list_projects_fields_and_summary(client, user_trips):
+    trips = (await client.get("/trips/2", params={"fields": "destination,status"})).json()
+    assert set(trips[0]) == {"destination", "status"}
+
+    summary = (await client.get("/trips/2", params={"summary": "true"})).json()
+    assert "description" not in summary[0] and summary[0]["destination"] == "Trip 11"
+
+    assert (await client.get("/trips/2", params={"fields": "password_hash"})).status_code == 400
+
+
+async def test_list_pages_by_cursor(client, user_trips):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/trips/2", params=params)).json()
+        seen.extend(trip["id"] for trip in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [11, 12, 13, 14, 15]
+
+
+@pytest.mark.parametrize("after_id", [{"gt": 1}, [1, 2], None, True, 1.5])
+async def test_forged_cursor_values_are_rejected(client, after_id):
+    cursor = base64.urlsafe_b64encode(json.dumps({"a": after_id}).encode("utf-8")).decode("ascii")
+
+    response = await client.get("/trips/1", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
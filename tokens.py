@@ -0,0 +1,195 @@
+import logging
+import os
+import time
+import uuid
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Request, status
+from jose import JWTError, jwt
+
+logger = logging.getLogger("tripolingo.tokens")
+
+# Signing keys as "kid:secret" pairs, comma separated. The first key signs
+# new tokens; the rest are still accepted so keys can be rotated without
+# logging everyone out.
+JWT_KEYS = os.getenv("JWT_KEYS", "")
+JWT_SECRET = os.getenv("JWT_SECRET", "")
+JWT_ALGORITHM = "HS256"
+
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", "900"))
+REFRESH_TOKEN_TTL = int(os.getenv("REFRESH_TOKEN_TTL", str(14 * 24 * 3600)))
+
+# User columns copied into access tokens so handlers can skip the lookup
+PREFERENCE_CLAIMS = ("preferred_budget", "preferred_activities", "preferred_regions")
+
+
+class TokenError(Exception):
+    """Raised when a token is missing, malformed, expired or of the wrong type."""
+
+
+def parse_keys(keys: str, secret: str = "") -> List[Tuple[str, str]]:
+    """
+    Parse JWT_KEYS ("kid:secret,kid:secret") into (kid, secret) pairs.
+    A bare JWT_SECRET is used as a single key with kid "default".
+    """
+    parsed = []
+    for entry in keys.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        kid, sep, key = entry.partition(":")
+        if not sep or not kid or not key:
+            raise ValueError("JWT_KEYS entries must look like kid:secret")
+        parsed.append((kid, key))
+
+    if not parsed and secret:
+        parsed.append(("default", secret))
+
+    return parsed
+
+
+class TokenService:
+    """
+    Issues and verifies signed, stateless access and refresh tokens.
+
+    Access tokens carry the user ID and the preference fields the chat and
+    recommendation handlers need, so those requests are authorized and
+    personalized without a database round-trip. Refresh tokens only carry
+    the user ID; exchanging one re-reads the user so preferences stay fresh.
+    """
+
+    def __init__(
+        self,
+        keys: List[Tuple[str, str]],
+        access_ttl: int = ACCESS_TOKEN_TTL,
+        refresh_ttl: int = REFRESH_TOKEN_TTL,
+    ):
+        self.keys = dict(keys)
+        self.signing_kid = keys[0][0] if keys else None
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.signing_kid is not None
+
+    def _encode(self, claims: dict) -> str:
+        return jwt.encode(
+            claims,
+            self.keys[self.signing_kid],
+            algorithm=JWT_ALGORITHM,
+            headers={"kid": self.signing_kid},
+        )
+
+    def issue_access(self, user: dict) -> str:
+        now = int(time.time())
+        return self._encode({
+            "sub": str(user["id"]),
+            "typ": "access",
+            "iat": now,
+            "exp": now + self.access_ttl,
+            "username": user.get("username"),
+            "prefs": {field: user.get(field) for field in PREFERENCE_CLAIMS},
+        })
+
+    def issue_refresh(self, user_id) -> str:
+        now = int(time.time())
+        return self._encode({
+            "sub": str(user_id),
+            "typ": "refresh",
+            "iat": now,
+            "exp": now + self.refresh_ttl,
+            "jti": uuid.uuid4().hex,
+        })
+
+    def issue_pair(self, user: dict) -> dict:
+        """
+        Build the token fields returned by signin and refresh.
+        """
+        return {
+            "access_token": self.issue_access(user),
+            "refresh_token": self.issue_refresh(user["id"]),
+            "token_type": "bearer",
+            "expires_in": self.access_ttl,
+        }
+
+    def decode(self, token: str, expected_type: str = "access") -> dict:
+        """
+        Verify a token's signature, expiry and type.
+
+        Args:
+            token: Encoded JWT
+            expected_type: "access" or "refresh"
+
+        Returns:
+            The token claims
+        """
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except JWTError:
+            raise TokenError("Malformed token")
+
+        key = self.keys.get(kid)
+        if key is None:
+            raise TokenError("Unknown signing key")
+
+        try:
+            claims = jwt.decode(token, key, algorithms=[JWT_ALGORITHM])
+        except JWTError as e:
+            raise TokenError(str(e))
+
+        if claims.get("typ") != expected_type:
+            raise TokenError("Wrong token type")
+
+        return claims
+
+
+token_service = TokenService(parse_keys(JWT_KEYS, JWT_SECRET))
+
+
+def check_token_config():
+    """
+    Warn when tokens are disabled. Called from the app lifespan, once
+    logging is configured.
+    """
+    if not token_service.enabled:
+        logger.warning("JWT_KEYS / JWT_SECRET not set - signin will not issue access tokens")
+
+
+def get_token_claims(request: Request) -> Optional[dict]:
+    """
+    FastAPI dependency returning verified access-token claims.
+
+    Requests without an Authorization header get None and keep the legacy
+    path-ID behaviour; a header with a bad token is rejected with 401.
+    """
+    header = request.headers.get("authorization")
+    if not header or not token_service.enabled:
+        return None
+
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authorization header",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    try:
+        return token_service.decode(token, "access")
+    except TokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Invalid token: {e}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def authorize_user(claims: Optional[dict], user_id) -> None:
+    """
+    Reject a token that belongs to a different user than the path ID.
+    """
+    if claims is not None and claims["sub"] != str(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token does not match user"
+        )
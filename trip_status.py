@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from projections import projection
+from repository import SupabaseRepository
+
+logger = logging.getLogger("tripolingo.trip_status")
+
+# Seconds between scheduled reconciliation runs. Statuses only change at
+# day boundaries, so runs after the first one of a day find nothing to do.
+TRIP_STATUS_INTERVAL = float(os.getenv("TRIP_STATUS_INTERVAL", "3600"))
+
+# Trips fetched per page while scanning
+TRIP_STATUS_BATCH = int(os.getenv("TRIP_STATUS_BATCH", "1000"))
+
+# Run the scheduled loop in this process ("0" disables). With several
+# workers, leave it on in one of them only; POST /admin/trips/reconcile
+# still works everywhere.
+TRIP_STATUS_SCHEDULER = os.getenv("TRIP_STATUS_SCHEDULER", "1") != "0"
+
+# scheduler_state row holding the date of the last run (sql/scheduler_state.sql)
+WATERMARK_NAME = "trip_status"
+
+# Statuses set by the user that dates never override
+MANUAL_STATUSES = ("wishlist", "cancelled")
+
+
+def _parse_date(value) -> Optional[date]:
+    if not value:
+        return None
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def derive_status(start_date, end_date, today: date, current: str = "planning") -> str:
+    """
+    Status a dated trip should have on `today`.
+
+    Args:
+        start_date: "YYYY-MM-DD" start (or the legacy trip_date)
+        end_date: "YYYY-MM-DD" end, defaults to the start date
+        today: Date to evaluate against
+        current: Status kept for wishlist/cancelled or undated trips
+
+    Returns:
+        "upcoming", "ongoing", "completed" or `current`
+    """
+    if current in MANUAL_STATUSES:
+        return current
+
+    try:
+        start = _parse_date(start_date)
+        end = _parse_date(end_date) or start
+    except (ValueError, TypeError):
+        return current
+
+    if start is None:
+        return current
+    if today < start:
+        return "upcoming"
+    if today <= end:
+        return "ongoing"
+    return "completed"
+
+
+def trip_status(trip: dict, today: date) -> str:
+    return derive_status(
+        trip.get("start_date") or trip.get("trip_date"),
+        trip.get("end_date") or trip.get("trip_date"),
+        today,
+        trip.get("status") or "planning",
+    )
+
+
+class TripStatusReconciler:
+    """
+    Persists date-derived trip statuses in bulk so reads can return the
+    stored value instead of parsing dates on every request.
+
+    Each run only selects trips whose start or end date was crossed since
+    the previous run, then issues one bulk PATCH per target status. The
+    date of the last run is persisted in scheduler_state, so a restart
+    resumes from it; only a process that cannot read it scans every dated
+    trip.
+    """
+
+    def __init__(self, repository: SupabaseRepository, interval: float = TRIP_STATUS_INTERVAL, batch_size: int = TRIP_STATUS_BATCH):
+        self.repository = repository
+        self.interval = interval
+        self.batch_size = batch_size
+        self.last_run = None
+        self.last_result = None
+        self._watermark_loaded = False
+        self._lock = asyncio.Lock()
+        self._task = None
+
+        self.runs = 0
+        self.failures = 0
+        self.updated = 0
+
+    async def run(self, today: date = None, full: bool = False) -> dict:
+        """
+        Reconcile statuses for trips whose date boundaries were crossed.
+
+        Args:
+            today: Date to evaluate against (defaults to today, UTC)
+            full: Ignore the last run and rescan every dated trip
+
+        Returns:
+            Summary with the rows checked and changed per status
+        """
+        today = today or datetime.utcnow().date()
+
+        async with self._lock:
+            if not self._watermark_loaded:
+                await self._load_watermark()
+            since = None if full else self.last_run
+            started_at = time.perf_counter()
+
+            if since is not None and since >= today:
+                changes = {}
+                checked = 0
+            else:
+                checked, changes = await self._reconcile(since, today)
+
+            updated = sum(changes.values())
+            if self.last_run != today:
+                await self._save_watermark(today)
+            self.last_run = today
+            self.runs += 1
+            self.updated += updated
+            self.last_result = {
+                "since": str(since) if since else None,
+                "until": str(today),
+                "checked": checked,
+                "updated": updated,
+                "by_status": changes,
+                "duration_ms": round((time.perf_counter() - started_at) * 1000, 2),
+            }
+            return self.last_result
+
+    async def _load_watermark(self):
+        try:
+            row = await self.repository.get_scheduler_state(WATERMARK_NAME, projection("trips.reconcile_watermark"))
+        except Exception as e:
+            logger.warning(
+                "Trip status watermark unavailable, scanning every dated trip",
+                extra={"event": "trip_status_watermark_error", "error": str(e)},
+            )
+        else:
+            if row is not None and self.last_run is None:
+                self.last_run = _parse_date(row["last_run"])
+        self._watermark_loaded = True
+
+    async def _save_watermark(self, today: date):
+        try:
+            await self.repository.set_scheduler_state(WATERMARK_NAME, {"last_run": str(today)})
+        except Exception as e:
+            logger.warning("Trip status watermark not saved", extra={"event": "trip_status_watermark_error", "error": str(e)})
+
+    async def _reconcile(self, since: Optional[date], today: date):
+        """
+        Scan one page at a time and PATCH that page's changes before reading
+        the next, so no request carries more than `batch_size` ids.
+
+        Returns:
+            (trips checked, {new status: trips updated})
+        """
+        checked = 0
+        changes = {}
+        after_id = None
+
+        while True:
+            trips = await self.repository.list_trips_crossing(
+                since, today, projection("trips.reconcile"), after_id=after_id, limit=self.batch_size
+            )
+            page = {}
+            for trip in trips:
+                new_status = trip_status(trip, today)
+                if new_status != trip.get("status"):
+                    page.setdefault(new_status, []).append(trip["id"])
+
+            for new_status, trip_ids in page.items():
+                await self.repository.set_trips_status(trip_ids, new_status)
+                changes[new_status] = changes.get(new_status, 0) + len(trip_ids)
+
+            checked += len(trips)
+            if len(trips) < self.batch_size:
+                return checked, changes
+            after_id = trips[-1]["id"]
+
+    async def _loop(self):
+        while True:
+            try:
+                result = await self.run()
+                if result["updated"]:
+                    logger.info("Trip statuses reconciled: %d updated", result["updated"], extra={"event": "trip_status_reconciled"})
+            except Exception as e:
+                self.failures += 1
+                logger.exception("Trip status reconciliation failed", extra={"event": "trip_status_error"})
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop(), name="trip-status-reconciler")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "last_run": str(self.last_run) if self.last_run else None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "updated": self.updated,
+            "last_result": self.last_result,
+        }
+
+
+def get_trip_reconciler(request: Request) -> TripStatusReconciler:
+    """
+    FastAPI dependency returning the shared trip status reconciler.
+    """
+    reconciler = getattr(request.app.state, "trip_status", None)
+
+    if reconciler is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is not configured"
+        )
+
+    return reconciler
@@ -1,21 +1,27 @@
-from fastapi import APIRouter, HTTPException
-from supabase import create_client, Client
-from datetime import datetime
+import asyncio
+import base64
+import json
 import os
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from database import get_repository
+from repository import SupabaseRepository
+from schemas import TripBulkSchema, TripPage, TripResponse
+from projections import Projection
+from http_cache import conditional_response
+from tokens import authorize_user, get_token_claims
+from query_params import split_values
+from trip_status import derive_status
+from datetime import date, datetime
 
 router = APIRouter()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 
 # ===============================
 # 💾 SAVE TRIP (Simple Save)
 # ===============================
 @router.post("/trips")
-async def save_trip(data: dict):
+async def save_trip(data: dict, repository: SupabaseRepository = Depends(get_repository)):
     """
     Save trip with destination_id and status.
     Frontend sends: user_id, destination_id, status
@@ -37,8 +43,8 @@ async def save_trip(data: dict):
     }
 
     try:
-        res = supabase.table("trips").insert(trip).execute()
-        return {"success": True, "data": res.data}
+        res = await repository.insert_trip(trip)
+        return {"success": True, "data": res}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -46,9 +52,13 @@ async def save_trip(data: dict):
 # ===============================
 # ✈️ CREATE TRIP
 # ===============================
-@router.post("/trips/create")
-async def create_trip(data: dict):
+def build_trip(data: dict) -> dict:
+    """
+    Validate a create-trip payload and shape the row to insert.
 
+    Raises:
+        ValueError: If required fields are missing or a date is invalid
+    """
     user_id = data.get("user_id")
     destination = data.get("destination")
     country = data.get("country")
@@ -61,24 +71,19 @@ async def create_trip(data: dict):
     status = data.get("status", "planning")  # Allow explicit status (e.g., wishlist)
 
     if not user_id or not destination or not start_date:
-        raise HTTPException(status_code=400, detail="Missing fields")
+        raise ValueError("Missing fields")
+
+    for value in (start_date, end_date):
+        if value:
+            try:
+                date.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid date: {value}")
 
     # 🎬 Smart Status Detection based on dates (only if not wishlist/cancelled)
-    if status not in ["wishlist", "cancelled"]:
-        today = datetime.utcnow().date()
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else start_date_obj
-
-        if today < start_date_obj:
-            status = "upcoming"
-        elif start_date_obj <= today <= end_date_obj:
-            status = "ongoing"
-        elif today > end_date_obj:
-            status = "completed"
-        else:
-            status = "planning"
+    status = derive_status(start_date, end_date, datetime.utcnow().date(), status)
 
-    trip = {
+    return {
         "user_id": user_id,
         "destination": destination,
         "country": country,
@@ -91,9 +96,18 @@ async def create_trip(data: dict):
         "status": status
     }
 
+
+@router.post("/trips/create")
+async def create_trip(data: dict, repository: SupabaseRepository = Depends(get_repository)):
+
+    try:
+        trip = build_trip(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        res = supabase.table("trips").insert(trip).execute()
-        return {"success": True, "trip": res.data}
+        res = await repository.insert_trip(trip)
+        return {"success": True, "trip": res}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -101,62 +115,270 @@ async def create_trip(data: dict):
 # ===============================
 # 📋 GET USER TRIPS
 # ===============================
-@router.get("/trips/{user_id}")
-async def get_trips(user_id: str):
+MAX_TRIP_PAGE_SIZE = 100
+
+# Columns clients may request with ?fields=
+TRIP_FIELDS = (
+    "id", "user_id", "destination", "destination_id", "country", "trip_date",
+    "start_date", "end_date", "image", "description", "activities", "status",
+    "created_at",
+)
+
+# Returned when no fields are requested
+TRIP_COLUMNS = tuple(field for field in TRIP_FIELDS if field != "created_at")
+
+# What the trip list cards render (no description/image/activities blobs)
+TRIP_SUMMARY_FIELDS = ("id", "destination", "destination_id", "country", "trip_date", "start_date", "end_date", "status")
 
+
+def _trip_projection(fields: List[str], summary: bool, paged: bool) -> Projection:
+    if summary:
+        columns = list(TRIP_SUMMARY_FIELDS)
+    elif fields:
+        unknown = [field for field in fields if field not in TRIP_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        columns = list(dict.fromkeys(fields))
+    else:
+        return Projection("trips", *TRIP_COLUMNS)
+
+    # Keyset paging needs the id of the last row
+    if paged and "id" not in columns:
+        columns.insert(0, "id")
+    return Projection("trips", *columns)
+
+
+def encode_trip_cursor(last_id) -> str:
+    raw = json.dumps({"a": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_trip_cursor(cursor: str):
     try:
-        res = supabase.table("trips").select("*").eq("user_id", user_id).execute()
-        trips = res.data
-        
-        # 🎬 Calculate dynamic status based on dates
-        today = datetime.utcnow().date()
-        
-        for trip in trips:
-            # Keep wishlist and cancelled as-is
-            if trip.get("status") in ["wishlist", "cancelled"]:
-                continue
-            
-            # Get start and end dates (support both trip_date and start_date formats)
-            start_date = trip.get("start_date") or trip.get("trip_date")
-            end_date = trip.get("end_date") or trip.get("trip_date")
-            
-            if not start_date:
-                continue
-            
-            # Parse dates
-            try:
-                start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-                end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else start_date_obj
-                
-                # Calculate status
-                if today < start_date_obj:
-                    trip["status"] = "upcoming"
-                elif start_date_obj <= today <= end_date_obj:
-                    trip["status"] = "ongoing"
-                elif today > end_date_obj:
-                    trip["status"] = "completed"
-            except (ValueError, TypeError):
-                # If date parsing fails, keep original status
-                pass
-        
-        return trips
+        after_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["a"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # The id goes into an id=gt.{...} filter; anything but a scalar id is forged
+    if isinstance(after_id, bool) or not isinstance(after_id, (int, str)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after_id
+
+
+def _parse_day(value: Optional[str], name: str) -> Optional[date]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be YYYY-MM-DD")
+
+
+@router.get("/trips/{user_id}", response_model=Union[List[TripResponse], TripPage])
+async def get_trips(
+    user_id: str,
+    request: Request,
+    status: Optional[List[str]] = Query(None),
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    fields: Optional[List[str]] = Query(None),
+    summary: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_TRIP_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    repository: SupabaseRepository = Depends(get_repository),
+    claims: Optional[dict] = Depends(get_token_claims),
+):
+    """
+    List a user's trips, filtered and projected in the database.
+
+    - `status`: one or more statuses (repeated or comma-separated)
+    - `from_date` / `to_date`: start date range, inclusive (YYYY-MM-DD)
+    - `fields`: columns to return; `summary=true` returns only the card fields
+    - `limit` / `cursor`: keyset pages ordered by id
+
+    Without `limit` or `cursor` the response is the plain list it has always
+    been. With them it is {"items", "next_cursor"}.
+    """
+    authorize_user(claims, user_id)
+
+    paged = limit is not None or cursor is not None
+    trip_projection = _trip_projection(split_values(fields), summary, paged)
+    start_from = _parse_day(from_date, "from_date")
+    start_to = _parse_day(to_date, "to_date")
+    after_id = decode_trip_cursor(cursor) if cursor else None
+    page_size = limit or MAX_TRIP_PAGE_SIZE
+
+    try:
+        # Statuses are kept current by the reconciliation job (trip_status.py)
+        trips = await repository.list_trips(
+            user_id,
+            trip_projection,
+            statuses=split_values(status),
+            start_from=start_from,
+            start_to=start_to,
+            after_id=after_id,
+            # One extra row tells us whether another page exists
+            limit=page_size + 1 if paged else None,
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if paged:
+        has_more = len(trips) > page_size
+        trips = trips[:page_size]
+        payload = {
+            "items": trips,
+            "next_cursor": encode_trip_cursor(trips[-1]["id"]) if has_more else None,
+        }
+    else:
+        payload = trips
+
+    # 🏷️ 304 when the client already has this exact trip list
+    return conditional_response(request, payload, cache_control="private, no-cache")
+
 
 # ===============================
 # ✅ UPDATE TRIP STATUS
 # ===============================
 @router.patch("/trips/status/{trip_id}")
-async def update_trip_status(trip_id: str):
+async def update_trip_status(trip_id: str, repository: SupabaseRepository = Depends(get_repository)):
 
     try:
-        res = supabase.table("trips") \
-            .update({"status": "completed"}) \
-            .eq("id", trip_id) \
-            .execute()
+        res = await repository.update_trip(trip_id, {"status": "completed"})
 
-        return {"success": True, "data": res.data}
+        return {"success": True, "data": res}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+# ===============================
+# 📦 BULK TRIP OPERATIONS
+# ===============================
+# Creates + updates + deletes accepted in one request
+TRIP_BULK_MAX_ITEMS = int(os.getenv("TRIP_BULK_MAX_ITEMS", "500"))
+
+TRIP_STATUSES = ("planning", "upcoming", "ongoing", "completed", "wishlist", "cancelled")
+
+
+def _item_error(index: int, error: str, **fields) -> dict:
+    return {"index": index, **fields, "success": False, "error": error}
+
+
+@router.post("/trips/bulk")
+async def bulk_trips(
+    data: TripBulkSchema,
+    repository: SupabaseRepository = Depends(get_repository),
+    claims: Optional[dict] = Depends(get_token_claims),
+):
+    """
+    Create, re-status and delete many of one user's trips in one request.
+
+    Body: {"user_id", "creates": [...], "updates": [{"id", "status"}], "deletes": [id, ...]}
+
+    - creates take the /trips/create payload (or the /trips payload with
+      just destination_id and status); user_id always comes from the batch
+    - at most TRIP_BULK_MAX_ITEMS items in total (413 above that)
+    - the whole batch is validated first; invalid items are reported and
+      skipped, the valid ones still run
+    - creates go out as one insert, updates as one PATCH per target status
+      and deletes as one DELETE, all at once. An insert is all-or-nothing;
+      updates and deletes only touch the user's own trips and report ids
+      that were not found
+    - every item gets a result with its index; `success` is true only if
+      every item succeeded
+    """
+    user_id = str(data.user_id)
+    authorize_user(claims, user_id)
+
+    total = len(data.creates) + len(data.updates) + len(data.deletes)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="Empty batch")
+    if total > TRIP_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {TRIP_BULK_MAX_ITEMS} items)")
+
+    # ✅ Validate everything before touching the database
+    create_results = [None] * len(data.creates)
+    new_trips = []
+    for index, item in enumerate(data.creates):
+        try:
+            if item.get("destination_id") and not item.get("destination"):
+                trip_status = item.get("status", "wishlist")
+                if trip_status not in TRIP_STATUSES:
+                    raise ValueError(f"Invalid status: {trip_status}")
+                trip = {
+                    "user_id": user_id,
+                    "destination_id": item["destination_id"],
+                    "status": trip_status
+                }
+            else:
+                trip = build_trip({**item, "user_id": user_id})
+        except ValueError as e:
+            create_results[index] = _item_error(index, str(e))
+            continue
+        new_trips.append((index, trip))
+
+    seen = set()
+    update_results = [None] * len(data.updates)
+    by_status = {}
+    for index, update in enumerate(data.updates):
+        trip_id = str(update.id)
+        if update.status not in TRIP_STATUSES:
+            update_results[index] = _item_error(index, f"Invalid status: {update.status}", id=update.id)
+        elif trip_id in seen:
+            update_results[index] = _item_error(index, "Trip appears more than once in this batch", id=update.id)
+        else:
+            seen.add(trip_id)
+            by_status.setdefault(update.status, []).append((index, update.id))
+
+    delete_results = [None] * len(data.deletes)
+    delete_ids = []
+    for index, trip_id in enumerate(data.deletes):
+        if str(trip_id) in seen:
+            delete_results[index] = _item_error(index, "Trip appears more than once in this batch", id=trip_id)
+        else:
+            seen.add(str(trip_id))
+            delete_ids.append((index, trip_id))
+
+    # 🚀 At most one call per operation (one per status for updates), run together
+    calls = []
+    if new_trips:
+        calls.append(("create", None, repository.insert_trips([trip for _, trip in new_trips])))
+    for new_status, items in by_status.items():
+        calls.append(("update", new_status, repository.set_trips_status([trip_id for _, trip_id in items], new_status, user_id=user_id)))
+    if delete_ids:
+        calls.append(("delete", None, repository.delete_trips(user_id, [trip_id for _, trip_id in delete_ids])))
+
+    outcomes = await asyncio.gather(*(call for _, _, call in calls), return_exceptions=True)
+
+    for (kind, new_status, _), outcome in zip(calls, outcomes):
+        failed = str(outcome) if isinstance(outcome, Exception) else None
+
+        if kind == "create":
+            for position, (index, _) in enumerate(new_trips):
+                if failed:
+                    create_results[index] = _item_error(index, failed)
+                else:
+                    create_results[index] = {"index": index, "success": True, "trip": outcome[position]}
+            continue
+
+        items = by_status[new_status] if kind == "update" else delete_ids
+        results = update_results if kind == "update" else delete_results
+        touched = set() if failed else {str(row["id"]) for row in outcome}
+        for index, trip_id in items:
+            if failed:
+                results[index] = _item_error(index, failed, id=trip_id)
+            elif str(trip_id) not in touched:
+                results[index] = _item_error(index, "Trip not found", id=trip_id)
+            elif kind == "update":
+                results[index] = {"index": index, "id": trip_id, "success": True, "status": new_status}
+            else:
+                results[index] = {"index": index, "id": trip_id, "success": True}
+
+    all_results = create_results + update_results + delete_results
+    return {
+        "success": all(result["success"] for result in all_results),
+        "creates": create_results,
+        "updates": update_results,
+        "deletes": delete_results
+    }